@@ -0,0 +1,51 @@
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.messages import AIMessage
+from typing import Any, Callable
+import asyncio
+import time
+import uuid
+
+class FakeChatModel(BaseChatModel):
+    script: Callable[[list, list], Any]
+    latency: float = 0.0
+    prompt_tokens: int = 100
+    completion_tokens: int = 20
+
+    @property
+    def _llm_type(self):
+        return "fake-chat-model"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _respond(self, messages, tools):
+        tool_names = [tool["function"]["name"] for tool in tools or []]
+        output = self.script(messages, tool_names)
+        usage = {
+            "input_tokens": self.prompt_tokens,
+            "output_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens
+        }
+
+        if isinstance(output, dict):
+            tool_name = output.get("tool", tool_names[0] if tool_names else None)
+            message = AIMessage(
+                content="",
+                tool_calls=[{"name": tool_name, "args": output["args"], "id": f"call_{uuid.uuid4().hex[:12]}"}],
+                usage_metadata=usage
+            )
+        else:
+            message = AIMessage(content=str(output), usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(messages, kwargs.get("tools"))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(messages, kwargs.get("tools"))
@@ -0,0 +1,95 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import json
+import time
+import uuid
+
+class FakeHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 512
+
+class FakeOpenAIServer:
+    def __init__(self, requests_per_second=0, latency=0.0, retry_after=1.0, host="127.0.0.1", port=0):
+        self.requests_per_second = requests_per_second
+        self.latency = latency
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.level = float(requests_per_second)
+        self.updated = time.monotonic()
+        self.stats = {"requests": 0, "completed": 0, "rate_limited": 0}
+        self.server = FakeHTTPServer((host, port), self._handler_class())
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _admit(self):
+        with self.lock:
+            self.stats["requests"] += 1
+            if not self.requests_per_second:
+                return True
+            now = time.monotonic()
+            self.level = min(self.requests_per_second, self.level + (now - self.updated) * self.requests_per_second)
+            self.updated = now
+            if self.level < 1:
+                self.stats["rate_limited"] += 1
+                return False
+            self.level -= 1
+            return True
+
+    def _handler_class(self):
+        fake = self
+
+        class FakeOpenAIHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, headers=None):
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send(404, {"error": {"message": "Not found"}})
+                    return
+                if not fake._admit():
+                    self._send(429, {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}, {
+                        "retry-after": f"{fake.retry_after:g}"
+                    })
+                    return
+
+                time.sleep(fake.latency)
+                prompt_tokens = len(json.dumps(request.get("messages", []))) // 4
+                content = f"Fake response to {len(request.get('messages', []))} message(s)"
+                self._send(200, {
+                    "id": f"chatcmpl-{uuid.uuid4().hex}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "fake"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 8, "total_tokens": prompt_tokens + 8}
+                })
+                with fake.lock:
+                    fake.stats["completed"] += 1
+
+        return FakeOpenAIHandler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="fake-openai", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
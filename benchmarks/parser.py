@@ -0,0 +1,114 @@
+import os
+import sys
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.tool_operations import tool_details, tool_parameters, render_tool
+import statistics
+import argparse
+import glob
+import time
+
+SAMPLE_CODES_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample_codes")
+
+FUNCTION_TEMPLATE = '''
+def step_{index}(value, scale: float = 1.5, options=(1, (2, 3)), label=None):
+    """Runs step {index} of the pipeline.
+
+    Args:
+        value (int): Input value.
+        scale: Multiplier applied to the value.
+    """
+    nested = [round((value * scale) / (1 + len(options)), 2) for _ in range(min(3, max(1, int(scale))))]
+    if label is not None:
+        nested.append(len(str(label)))
+    return step_{previous}(sum(nested), scale) if {index} else sum(nested)
+'''
+
+CLASS_TEMPLATE = '''
+class Accumulator{index}:
+    def __init__(self, start=0):
+        self.total = start
+
+    def add(self, value):
+        self.total += value
+        return self.total
+'''
+
+def generate_script(functions):
+    parts = ["import math\nimport json as serializer\nfrom collections import OrderedDict\n"]
+    for index in range(functions):
+        parts.append(FUNCTION_TEMPLATE.format(index=index, previous=max(index - 1, 0)))
+        if index % 25 == 0:
+            parts.append(CLASS_TEMPLATE.format(index=index))
+    parts.append(f'''
+if __name__ == "__main__":
+    value = int(input("Enter a value: "))
+    scale = float(input("Enter a scale: "))
+    label = input("Enter a label: ")
+    input("Press enter to continue")
+    step_{functions - 1}(value, scale, label=label)
+''')
+    return "".join(parts)
+
+def load_corpus(corpus_directory, files, functions):
+    if corpus_directory:
+        paths = sorted(glob.glob(os.path.join(corpus_directory, "**", "*.py"), recursive=True))
+        corpus = []
+        for path in paths:
+            with open(path, encoding="utf-8") as file:
+                corpus.append((path, file.read()))
+        return corpus
+    corpus = [(f"generated_{index}.py", generate_script(functions)) for index in range(files)]
+    for path in sorted(glob.glob(os.path.join(SAMPLE_CODES_DIRECTORY, "*.py"))):
+        with open(path, encoding="utf-8") as file:
+            corpus.append((path, file.read()))
+    return corpus
+
+def measure(corpus, runs):
+    timings = {"parse": [], "render": [], "compile": []}
+    failures = {}
+    for _ in range(runs):
+        totals = dict.fromkeys(timings, 0.0)
+        for path, source in corpus:
+            try:
+                started = time.perf_counter()
+                details = tool_details("Benchmark Tool", "Benchmark tool", source)
+                parsed = time.perf_counter()
+                final_code = render_tool(details, tool_parameters(details))[2]
+                rendered = time.perf_counter()
+                compile(final_code, path, "exec")
+                compiled = time.perf_counter()
+            except (SyntaxError, ValueError) as error:
+                failures[path] = f"{type(error).__name__}: {error}"
+                continue
+            totals["parse"] += parsed - started
+            totals["render"] += rendered - parsed
+            totals["compile"] += compiled - rendered
+        for stage, total in totals.items():
+            timings[stage].append(total * 1000)
+    return timings, failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure parse_code, tool rendering and compilation over a corpus of scripts.")
+    parser.add_argument("--corpus", help="Directory of Python scripts to use instead of the generated corpus")
+    parser.add_argument("--files", type=int, default=20, help="Number of generated scripts")
+    parser.add_argument("--functions", type=int, default=200, help="Functions per generated script")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus, args.files, args.functions)
+    size_kb = sum(len(source.encode("utf-8")) for _, source in corpus) / 1024
+    timings, failures = measure(corpus, args.runs)
+
+    print(f"Corpus: {len(corpus)} file(s), {size_kb:.0f} KB, median of {args.runs} runs\n")
+    print(f"{'Stage':<10}{'Total ms':>12}{'ms/file':>12}{'KB/s':>12}")
+    for stage, values in [*timings.items(), ("total", [sum(run) for run in zip(*timings.values())])]:
+        median = statistics.median(values)
+        print(f"{stage:<10}{median:>12.1f}{median / len(corpus):>12.2f}{size_kb / (median / 1000) if median else 0:>12.0f}")
+    for path, error in failures.items():
+        print(f"\n❌ {path}: {error}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import os
+import sys
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("RUN_LOG", "false")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from modules import agent_operations, repository, tool_operations, workflow_operations, workflow_graph
+from modules.llm_config import set_llm
+from modules.db_config import set_db
+from benchmarks.fake_llm import FakeChatModel
+import subprocess
+import tracemalloc
+import argparse
+import tempfile
+import asyncio
+import glob
+import json
+import time
+import mongomock
+
+RESULTS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+TOOL_TEMPLATE = '''
+from langchain_core.tools import BaseTool
+
+class BenchmarkTool{index}(BaseTool):
+\tname: str = "benchmark_tool_{index}"
+\tdescription: str = """Echoes the given text."""
+
+\tdef _run(self, text: str):
+\t\treturn text
+'''
+
+LOWER_IS_BETTER = ("_ms", "_kb")
+
+def install(db, llm):
+    set_db(db)
+    set_llm(llm)
+
+def reset_caches():
+    agent_operations.invalidate_compiled_agent()
+    repository.invalidate()
+    tool_operations._tool_registry.clear()
+    workflow_graph.invalidate_compiled_workflow()
+
+def create_tools(db, tools_directory, count):
+    tool_ids = []
+    for index in range(count):
+        tool_path = os.path.join(tools_directory, f"Benchmark_Tool_{index}.py")
+        with open(tool_path, "w", encoding="utf-8") as file:
+            file.write(TOOL_TEMPLATE.format(index=index))
+        result = db['tools'].insert_one({"name": f"Benchmark Tool {index}", "description": "Echo", "tool_path": tool_path})
+        tool_ids.append(str(result.inserted_id))
+    return tool_ids
+
+def create_workflow(db, width, depth, tool_ids):
+    layers = []
+    for layer in range(depth):
+        layers.append([
+            str(db['agents'].insert_one({
+                "name": f"L{layer}N{index}",
+                "description": f"Benchmark agent {index} of layer {layer}",
+                "prompt": "You are a benchmark agent. Call your tools once, then answer.",
+                "tools": tool_ids
+            }).inserted_id)
+            for index in range(width)
+        ])
+
+    nodes = []
+    for layer, agent_ids in enumerate(layers):
+        connects = layers[layer + 1] if layer + 1 < depth else []
+        for index, agent_id in enumerate(agent_ids):
+            nodes.append({"agent_id": agent_id, "name": f"L{layer}N{index}", "description": "Benchmark agent", "connects": connects})
+
+    result = db['workflows'].insert_one({
+        "workflow_name": f"benchmark-{width}x{depth}",
+        "workflow_description": "Synthetic benchmark workflow",
+        "workflow": nodes
+    })
+    return workflow_operations.format_workflow(db['workflows'].find_one({"_id": result.inserted_id})), layers
+
+def make_script(layers, calls):
+    layer_of = {f"L{layer}N{index}": layer for layer, agent_ids in enumerate(layers) for index in range(len(agent_ids))}
+
+    def script(messages, tool_names):
+        calls["llm"] += 1
+        if "DecidingSupervisorResponseFormat" in tool_names:
+            calls["supervisor"] += 1
+            layer = next((layer_of[message.name] for message in reversed(messages) if isinstance(message, AIMessage) and message.name in layer_of), -1)
+            finished = layer + 1 >= len(layers)
+            return {"tool": "DecidingSupervisorResponseFormat", "args": {
+                "next_nodes": ["FINISH"] if finished else layers[layer + 1],
+                "reasoning": "Benchmark routing",
+                "instructions": "Run your benchmark step.",
+                "direct_response": "Benchmark complete." if finished else None,
+                "workflow_started": True
+            }}
+        if tool_names and not isinstance(messages[-1], ToolMessage):
+            return {"tool": tool_names[0], "args": {"text": "ping"}}
+        return "Benchmark step done."
+
+    return script
+
+def measure(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+def bench_tool_loading(db, tools_directory, tool_counts, repeat):
+    results = {}
+    for count in tool_counts:
+        tool_ids = create_tools(db, tools_directory, count)
+        for pyc in glob.glob(os.path.join(tools_directory, "__pycache__", "*.pyc")):
+            os.remove(pyc)
+
+        reset_caches()
+        start = time.perf_counter()
+        tool_operations.fetch_tool_objects(tool_ids)
+        results[f"fetch_tool_objects.cold.{count}_tools_ms"] = (time.perf_counter() - start) * 1000
+
+        def cached_bytecode():
+            reset_caches()
+            tool_operations.fetch_tool_objects(tool_ids)
+        results[f"fetch_tool_objects.bytecode.{count}_tools_ms"] = measure(cached_bytecode, repeat)
+        results[f"fetch_tool_objects.warm.{count}_tools_ms"] = measure(lambda: tool_operations.fetch_tool_objects(tool_ids), repeat)
+    return results
+
+def bench_agent_hop(db, tools_directory, tool_counts, latency, repeat):
+    results = {}
+    for count in tool_counts:
+        tool_ids = create_tools(db, tools_directory, count)
+        workflow, layers = create_workflow(db, 1, 1, tool_ids)
+        calls = {"llm": 0, "supervisor": 0}
+        install(db, FakeChatModel(script=make_script(layers, calls), latency=latency))
+        agent = agent_operations.get_agents(layers[0])[0]
+        state = [HumanMessage(content="Run the benchmark.", name="user"), AIMessage(content="Run your benchmark step.", name="supervisor")]
+
+        reset_caches()
+        calls["llm"] = 0
+        start = time.perf_counter()
+        agent_operations.invoke_agent(dict(agent), list(state))
+        cold_ms = (time.perf_counter() - start) * 1000
+        results[f"invoke_agent.cold.{count}_tools.overhead_ms"] = cold_ms - calls["llm"] * latency * 1000
+
+        calls["llm"] = 0
+        warm_ms = measure(lambda: agent_operations.invoke_agent(dict(agent), list(state)), repeat)
+        results[f"invoke_agent.warm.{count}_tools.overhead_ms"] = warm_ms - calls["llm"] / repeat * latency * 1000
+    return results
+
+async def run_workflows(workflow, runs, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    hops = []
+
+    async def run_once():
+        async with semaphore:
+            agent_runs = 0
+            async for event in workflow_operations.astream_workflow(workflow, "Run the benchmark."):
+                if event["type"] == "agent_message":
+                    agent_runs += 1
+            hops.append(agent_runs)
+
+    await asyncio.gather(*(run_once() for _ in range(runs)))
+    return sum(hops)
+
+def bench_workflows(db, tools_directory, widths, depths, tool_counts, latency, runs, concurrency, engines):
+    results = {}
+    for count in tool_counts:
+        tool_ids = create_tools(db, tools_directory, count)
+        for width in widths:
+            for depth in depths:
+                for engine in engines:
+                    workflow, layers = create_workflow(db, width, depth, tool_ids)
+                    calls = {"llm": 0, "supervisor": 0}
+                    install(db, FakeChatModel(script=make_script(layers, calls), latency=latency))
+                    reset_caches()
+                    workflow_operations.WORKFLOW_ENGINE = engine
+
+                    tracemalloc.start()
+                    start = time.perf_counter()
+                    agent_hops = asyncio.run(run_workflows(workflow, runs, concurrency))
+                    wall = time.perf_counter() - start
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+
+                    name = f"{'workflow' if engine == 'loop' else f'workflow_{engine}'}.{width}x{depth}.{count}_tools"
+                    results[f"{name}.throughput_runs_per_s"] = runs / wall
+                    results[f"{name}.per_hop_overhead_ms"] = max(wall * 1000 - calls["llm"] * latency * 1000 / concurrency, 0) / max(agent_hops, 1)
+                    results[f"{name}.supervisor_calls_per_run"] = calls["supervisor"] / runs
+                    results[f"{name}.peak_memory_kb"] = peak / 1024
+    return results
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def latest_baseline(revision):
+    candidates = [path for path in glob.glob(os.path.join(RESULTS_DIRECTORY, "*.json")) if os.path.basename(path) != f"{revision}.json"]
+    return max(candidates, key=os.path.getmtime) if candidates else None
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for metric, value in results.items():
+        previous = baseline.get(metric)
+        if not previous or metric.endswith("supervisor_calls_per_run"):
+            continue
+        change = (value - previous) / previous
+        if metric.endswith(LOWER_IS_BETTER) and change > threshold:
+            regressions.append((metric, previous, value, change))
+        elif metric.endswith("per_s") and -change > threshold:
+            regressions.append((metric, previous, value, change))
+    return regressions
+
+def parse_list(value):
+    return [int(item) for item in value.split(",") if item.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark orchestrator overhead with a fake LLM and an in-memory MongoDB.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated LLM latency in seconds")
+    parser.add_argument("--widths", type=parse_list, default=[1, 4])
+    parser.add_argument("--depths", type=parse_list, default=[1, 4])
+    parser.add_argument("--tools", type=parse_list, default=[0, 20])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--engines", type=lambda value: [item.strip() for item in value.split(",") if item.strip()], default=["loop", "graph"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", help="Results file to compare against (defaults to the latest saved run)")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative slowdown that counts as a regression")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    db = mongomock.MongoClient()['agentOrchestratorBenchmark']
+    install(db, None)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tools_directory:
+        results.update(bench_tool_loading(db, tools_directory, args.tools, args.repeat))
+        results.update(bench_agent_hop(db, tools_directory, args.tools, args.latency, args.repeat))
+        results.update(bench_workflows(db, tools_directory, args.widths, args.depths, args.tools, args.latency, args.runs, args.concurrency, args.engines))
+
+    print(f"\n{'Metric':<60}{'Value':>14}")
+    for metric, value in results.items():
+        print(f"{metric:<60}{value:>14.2f}")
+
+    revision = git_revision()
+    baseline_path = args.baseline or latest_baseline(revision)
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file)["results"], args.threshold)
+        print(f"\nCompared against {os.path.basename(baseline_path)}: {len(regressions)} regression(s)")
+        for metric, previous, value, change in regressions:
+            print(f"  - {metric}: {previous:.2f} -> {value:.2f} ({change:+.0%})")
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIRECTORY, exist_ok=True)
+        with open(os.path.join(RESULTS_DIRECTORY, f"{revision}.json"), "w", encoding="utf-8") as file:
+            json.dump({"revision": revision, "created_at": time.time(), "arguments": vars(args), "results": results}, file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import os
+import sys
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.llm_scheduler import configure_scheduler, priority
+from modules.llm_config import get_llm, set_llm, LLM_MAX_RETRIES
+from langchain_openai import ChatOpenAI
+from benchmarks.fake_openai import FakeOpenAIServer
+import statistics
+import argparse
+import asyncio
+import time
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+async def run_workload(model, interactive, batch, stagger):
+    latencies = {"interactive": [], "batch": []}
+    failures = {"interactive": 0, "batch": 0}
+
+    async def call(level, index):
+        with priority(level):
+            started = time.perf_counter()
+            try:
+                await get_llm(model).ainvoke(f"{level} request {index}")
+            except Exception:
+                failures[level] += 1
+                return
+            latencies[level].append((time.perf_counter() - started) * 1000)
+
+    async def interactive_calls():
+        await asyncio.sleep(stagger)
+        await asyncio.gather(*(call("interactive", index) for index in range(interactive)))
+
+    started = time.perf_counter()
+    await asyncio.gather(interactive_calls(), *(call("batch", index) for index in range(batch)))
+    return time.perf_counter() - started, latencies, failures
+
+def run_scenario(name, server, requests_per_minute, args):
+    model = f"fake-{name}"
+    configure_scheduler(model, requests_per_minute)
+    if not requests_per_minute:
+        set_llm(ChatOpenAI(model=model, max_retries=LLM_MAX_RETRIES), model)
+    before = dict(server.stats)
+    elapsed, latencies, failures = asyncio.run(run_workload(model, args.interactive, args.batch, args.stagger))
+    return {
+        "scenario": name,
+        "elapsed_s": elapsed,
+        "server_429s": server.stats["rate_limited"] - before["rate_limited"],
+        "retries": server.stats["requests"] - before["requests"] - args.batch - args.interactive,
+        "failures": sum(failures.values()),
+        "interactive_p50_ms": statistics.median(latencies["interactive"]) if latencies["interactive"] else 0.0,
+        "interactive_p95_ms": percentile(latencies["interactive"], 0.95),
+        "batch_p50_ms": statistics.median(latencies["batch"]) if latencies["batch"] else 0.0,
+        "batch_p95_ms": percentile(latencies["batch"], 0.95)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Run LLM calls against a local fake OpenAI endpoint with and without the request scheduler.")
+    parser.add_argument("--server-rps", type=float, default=20, help="Requests per second the fake endpoint accepts before returning 429")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds the fake endpoint takes per completion")
+    parser.add_argument("--interactive", type=int, default=20, help="Interactive calls, started after the batch calls")
+    parser.add_argument("--batch", type=int, default=200, help="Batch calls")
+    parser.add_argument("--stagger", type=float, default=0.2, help="Seconds between starting the batch and the interactive calls")
+    parser.add_argument("--headroom", type=float, default=0.9, help="Fraction of the endpoint's limit the scheduler targets")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(args.server_rps, args.latency, retry_after=1.0).start()
+    os.environ["OPENAI_API_BASE"] = server.base_url
+    try:
+        results = [
+            run_scenario("unscheduled", server, 0, args),
+            run_scenario("scheduled", server, int(args.server_rps * 60 * args.headroom), args)
+        ]
+    finally:
+        server.stop()
+
+    columns = list(results[0])
+    print("".join(f"{column:>20}" for column in columns))
+    for result in results:
+        print("".join(f"{value:>20.1f}" if isinstance(value, float) else f"{value:>20}" for value in result.values()))
+
+if __name__ == "__main__":
+    main()
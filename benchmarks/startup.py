@@ -0,0 +1,61 @@
+import subprocess
+import statistics
+import argparse
+import sys
+import os
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["pymongo", "motor", "bson", "langchain_core", "langchain_openai", "langgraph", "openai"]
+
+PROBE = f"""
+import sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+loaded = [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+print(elapsed, ",".join(loaded))
+"""
+
+def measure_startup(runs):
+    environment = {**os.environ, "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "sk-benchmark")}
+    timings = []
+    loaded = ""
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE],
+            cwd=REPOSITORY_ROOT, env=environment, capture_output=True, text=True, check=True
+        ).stdout.split()
+        timings.append(float(output[0]) * 1000)
+        loaded = output[1] if len(output) > 1 else ""
+    return timings, loaded
+
+def import_profile(top):
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=REPOSITORY_ROOT, capture_output=True, text=True, check=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how long `import main` takes in a fresh interpreter.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to list")
+    args = parser.parse_args()
+
+    timings, loaded = measure_startup(args.runs)
+    print(f"import main: median {statistics.median(timings):.1f} ms, min {min(timings):.1f} ms, max {max(timings):.1f} ms over {args.runs} runs")
+    print(f"Heavy modules loaded at import: {loaded or 'none'}")
+
+    print(f"\n{'Module':<50}{'Cumulative ms':>15}")
+    for cumulative, name in import_profile(args.top):
+        print(f"{name:<50}{cumulative / 1000:>15.1f}")
+
+if __name__ == "__main__":
+    main()
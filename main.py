@@ -1,8 +1,79 @@
 from modules.workflow_operations import create_workflow, display_workflows, invoke_workflow
 from modules.agent_operations import agent_creation, display_agents, map_agents_tools
 from modules.tool_operations import tool_creation, display_tools
+from modules.repository import init_repository
+import argparse
+import sys
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build, manage and run agentic workflows. Run without a command for the interactive menu.")
+    commands = parser.add_subparsers(dest="command")
+
+    run_parser = commands.add_parser("run", help="Run a workflow over a JSONL file of prompts")
+    run_parser.add_argument("workflow", help="Workflow name or ID")
+    run_parser.add_argument("--input", default="-", help="JSONL file of prompts, one {\"prompt\": ...} object or string per line (default: stdin)")
+    run_parser.add_argument("--output", default="-", help="JSONL file to append results to (default: stdout)")
+    run_parser.add_argument("--concurrency", type=int, help="Prompts to run at once (default: BATCH_CONCURRENCY)")
+
+    serve_parser = commands.add_parser("serve", help="Serve workflow invocation over HTTP")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    serve_parser.add_argument("--concurrency", type=int, help="Workflow runs to execute at once (default: SERVER_CONCURRENCY)")
+
+    resume_parser = commands.add_parser("resume", help="Resume a workflow run from its latest checkpoint")
+    resume_parser.add_argument("run_id")
+
+    replay_parser = commands.add_parser("replay", help="Replay the saved hops of a workflow run without calling the LLM")
+    replay_parser.add_argument("run_id")
+    replay_parser.add_argument("--until", help="Stop at this checkpoint ID")
+
+    fork_parser = commands.add_parser("fork", help="Start a new run from a checkpoint")
+    fork_parser.add_argument("checkpoint_id")
+    fork_parser.add_argument("--prompt", help="Follow-up user message to add before continuing")
+
+    runs_parser = commands.add_parser("runs", help="List recent workflow runs from the run log")
+    runs_parser.add_argument("--workflow", help="Only list runs of this workflow name or ID")
+    runs_parser.add_argument("--limit", type=int, default=20)
+
+    build_parser = commands.add_parser("build-tools", help="Build tools from every Python file in a directory")
+    build_parser.add_argument("directory")
+    build_parser.add_argument("--recursive", action="store_true", help="Include subdirectories")
+    build_parser.add_argument("--concurrency", type=int, help="Files to build at once (default: TOOL_BUILD_CONCURRENCY)")
+    build_parser.add_argument("--rate", type=float, help="Parameter-typing LLM calls per second (default: TOOL_BUILD_RATE)")
+    build_parser.add_argument("--batch-size", type=int, help="Tools whose parameters are typed in one LLM request (default: TOOL_BUILD_BATCH_SIZE)")
+    build_parser.add_argument("--execution", choices=["inline", "thread", "process"], help="Execution mode for the built tools (default: TOOL_EXECUTION)")
+    build_parser.add_argument("--memoize", choices=["off", "pure", "ttl"], help="Cache tool results by arguments: pure tools forever, ttl tools for --memoize-ttl seconds (default: off)")
+    build_parser.add_argument("--memoize-ttl", type=float, help="Seconds results of ttl tools stay cached (default: TOOL_CACHE_TTL)")
+    build_parser.add_argument("--force", action="store_true", help="Rebuild files whose content has not changed")
+
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+    init_repository()
+
+    if args.command == "run":
+        from modules.runner import run_batch
+        sys.exit(run_batch(args.workflow, args.input, args.output, args.concurrency))
+    if args.command in ("resume", "replay", "fork"):
+        from modules.runner import print_events, resume_events, replay_events, fork_events
+        make_events = {
+            "resume": lambda: resume_events(args.run_id),
+            "replay": lambda: replay_events(args.run_id, args.until),
+            "fork": lambda: fork_events(args.checkpoint_id, args.prompt)
+        }[args.command]
+        sys.exit(print_events(make_events))
+    if args.command == "runs":
+        from modules.runner import display_runs
+        sys.exit(display_runs(args.workflow, args.limit))
+    if args.command == "build-tools":
+        from modules.tool_builder import build_tools
+        sys.exit(build_tools(args.directory, args.recursive, args.execution, args.concurrency, args.rate, args.force, args.batch_size, args.memoize, args.memoize_ttl))
+    if args.command == "serve":
+        from modules.server import serve
+        serve(args.host, args.port, args.concurrency)
+        return
+
     while True:
         print("""\n--------------------------------------
 What would you like to do?
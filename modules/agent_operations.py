@@ -1,70 +1,194 @@
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from modules.tool_operations import fetch_tool_objects, fetch_tools
-from langgraph.prebuilt import create_react_agent
-from modules.llm_config import llm
-from modules.db_config import db
-from bson import ObjectId
+from modules.repository import get_documents, iter_documents, invalidate
+from modules.llm_config import get_llm, model_for
+from modules.db_config import get_db
+from modules import telemetry
+from collections import OrderedDict
+import threading
+import asyncio
+import hashlib
+import json
+import os
+
+AGENT_CACHE_SIZE = int(os.getenv("AGENT_CACHE_SIZE", "64"))
+
+_compiled_agents = OrderedDict()
+_compiled_agents_lock = threading.Lock()
+_build_locks = {}
+agent_cache_stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
 
 def agent_creation():
-    agents_collection = db['agents']
+    agents_collection = get_db()['agents']
 
     agent_name = input("\nEnter Agent Name: ")
     agent_description = input("Enter Agent Description: ")
     agent_prompt = input("Enter Agent Prompt: ")
+    agent_model = input("Enter Agent Model or press Enter for default: ").strip()
     
     agent_data = {
         "name": agent_name,
         "description": agent_description,
-        "prompt": agent_prompt
+        "prompt": agent_prompt,
+        "model": agent_model or None
     }
 
     result = agents_collection.insert_one(agent_data)
+    invalidate("agents", result.inserted_id)
+    invalidate_compiled_agent(str(result.inserted_id))
 
     print(f"\n✅ Created agent with object id: {result.inserted_id} ✅\n\n")
 
+def format_agent(agent):
+    return {
+        "agent_id": str(agent.get("_id")),
+        "agent_name": agent.get("name"),
+        "agent_description": agent.get("description"),
+        "agent_prompt": agent.get("prompt"),
+        "tools": agent.get("tools"),
+        "model": agent.get("model")
+    }
+
+def iter_agents(page_size=None):
+    for i, agent in enumerate(iter_documents("agents", page_size=page_size), start=1):
+        yield {"reference_id": i, **format_agent(agent)}
+
 def fetch_agents():
-    agents_collection = db['agents']
-    agents = agents_collection.find()
-    available_agents = []
-    for i, agent in enumerate(agents, start=1):
-        available_agents.append({
-            "reference_id": i,
-            "agent_id": str(agent.get("_id")),
-            "agent_name": agent.get("name"),
-            "agent_description": agent.get("description"),
-            "agent_prompt": agent.get("prompt"),
-            "tools": agent.get("tools")
-        })
-    
-    return available_agents
+    return list(iter_agents())
+
+def get_agents(agent_ids):
+    return [format_agent(agent) for agent in get_documents("agents", agent_ids)]
 
 def display_agents(agents):
-    if agents is None or len(agents) == 0:
-        agents = fetch_agents()
+    if not agents:
+        agents = iter_agents()
     
     print("\n\nAvailable Agents:\n")
     for agent in agents:
         print(f"  - Reference ID: {agent['reference_id']}, Agent ID: {agent['agent_id']}, Name: {agent['agent_name']}, Description: {agent['agent_description']}, Prompt: {agent["agent_prompt"][:30]}...{agent["agent_prompt"][-30:]}")
 
+def agent_version(agent):
+    version_data = {
+        "name": agent['agent_name'],
+        "prompt": agent['agent_prompt'],
+        "tools": agent['tools'] or [],
+        "model": model_for("agent", agent)
+    }
+    return hashlib.sha256(json.dumps(version_data, sort_keys=True).encode('utf-8')).hexdigest()
+
+def _cached_agent(cache_key):
+    worker_agent = _compiled_agents.get(cache_key)
+    if worker_agent is not None:
+        _compiled_agents.move_to_end(cache_key)
+        agent_cache_stats["hits"] += 1
+        telemetry.increment("agent_cache_hits")
+    return worker_agent
+
+def get_compiled_agent(agent):
+    cache_key = (agent['agent_id'], agent_version(agent))
+
+    with _compiled_agents_lock:
+        worker_agent = _cached_agent(cache_key)
+        if worker_agent is not None:
+            return worker_agent
+        build_lock = _build_locks.setdefault(cache_key, threading.Lock())
+
+    with build_lock:
+        with _compiled_agents_lock:
+            worker_agent = _cached_agent(cache_key)
+            if worker_agent is not None:
+                return worker_agent
+            agent_cache_stats["misses"] += 1
+            telemetry.increment("agent_cache_misses")
+
+        try:
+            with telemetry.span("agent.build", agent=agent['agent_name']):
+                from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+                from langgraph.prebuilt import create_react_agent
+
+                tool_ids = [tool_id for tool_id in agent['tools'] or []]
+                tools = fetch_tool_objects(tool_ids)
+                worker_agent = create_react_agent(
+                    model=get_llm(model_for("agent", agent)),
+                    tools=tools,
+                    prompt=ChatPromptTemplate([
+                        agent['agent_prompt'], 
+                        MessagesPlaceholder("messages")
+                    ]),
+                    name=agent['agent_name'],
+                )
+
+            with _compiled_agents_lock:
+                stale_keys = [key for key in _compiled_agents if key[0] == cache_key[0] and key != cache_key]
+                for key in stale_keys:
+                    del _compiled_agents[key]
+                    agent_cache_stats["invalidations"] += 1
+                _compiled_agents[cache_key] = worker_agent
+                _compiled_agents.move_to_end(cache_key)
+                while len(_compiled_agents) > AGENT_CACHE_SIZE:
+                    _compiled_agents.popitem(last=False)
+                    agent_cache_stats["evictions"] += 1
+        finally:
+            with _compiled_agents_lock:
+                _build_locks.pop(cache_key, None)
+
+    return worker_agent
+
+def invalidate_compiled_agent(agent_id=None):
+    with _compiled_agents_lock:
+        stale_keys = [key for key in _compiled_agents if agent_id is None or key[0] == agent_id]
+        for key in stale_keys:
+            del _compiled_agents[key]
+        agent_cache_stats["invalidations"] += len(stale_keys)
+
+def get_agent_cache_stats():
+    with _compiled_agents_lock:
+        lookups = agent_cache_stats["hits"] + agent_cache_stats["misses"]
+        return {
+            **agent_cache_stats,
+            "size": len(_compiled_agents),
+            "max_size": AGENT_CACHE_SIZE,
+            "hit_rate": agent_cache_stats["hits"] / lookups if lookups else 0.0
+        }
+
 def invoke_agent(agent, state):
     if agent['tools'] is None:
         agent['tools'] = []
-    tool_ids = [tool_id for tool_id in agent['tools']]
-    tools = fetch_tool_objects(tool_ids)
-    worker_agent = create_react_agent(
-        model=llm,
-        tools=tools,
-        prompt=ChatPromptTemplate([
-            agent['agent_prompt'], 
-            MessagesPlaceholder("messages")
-        ]),
-        name=agent['agent_name'],
-    )
+    worker_agent = get_compiled_agent(agent)
     agent_response = worker_agent.invoke({
         "messages": state
     })
     return agent_response["messages"][-1]
 
+async def astream_agent(agent, state):
+    from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+
+    if agent['tools'] is None:
+        agent['tools'] = []
+    worker_agent = await asyncio.to_thread(get_compiled_agent, agent)
+    event_source = {"agent_id": agent['agent_id'], "agent_name": agent['agent_name']}
+    handler = telemetry.callback_handler(agent=agent['agent_name'])
+    config = {"callbacks": [handler]} if handler else None
+
+    yield {"type": "agent_start", **event_source}
+    agent_response = None
+    async for mode, chunk in worker_agent.astream({"messages": state}, config, stream_mode=["messages", "updates"]):
+        if mode == "messages":
+            message, _ = chunk
+            if isinstance(message, AIMessageChunk) and isinstance(message.content, str) and message.content:
+                yield {"type": "token", **event_source, "content": message.content}
+            continue
+
+        for update in chunk.values():
+            for message in (update or {}).get("messages", []):
+                if isinstance(message, AIMessage):
+                    for tool_call in message.tool_calls:
+                        yield {"type": "tool_start", **event_source, "tool": tool_call["name"], "args": tool_call["args"]}
+                    agent_response = message
+                elif isinstance(message, ToolMessage):
+                    yield {"type": "tool_end", **event_source, "tool": message.name, "output": message.content}
+
+    yield {"type": "agent_message", **event_source, "message": agent_response}
+
 def map_agents_tools():
     agents = fetch_agents()
     for agent in agents:
@@ -96,10 +220,14 @@ def map_agents_tools():
         print("\n❌ Some Tool IDs were not found. Please try again. ❌")
         return
 
-    agents_collection = db['agents']
+    from bson import ObjectId
+
+    agents_collection = get_db()['agents']
     agents_collection.update_one(
         {"_id": ObjectId(selected_agent["agent_id"])},
         {"$set": {"tools": selected_tool_ids}}
     )
+    invalidate("agents", selected_agent["agent_id"])
+    invalidate_compiled_agent(selected_agent["agent_id"])
 
     print("✅ Tools mapped successfully!")
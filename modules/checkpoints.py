@@ -0,0 +1,63 @@
+from modules.db_config import get_db
+from modules import telemetry
+from dotenv import load_dotenv
+import time
+import uuid
+import os
+
+load_dotenv()
+
+WORKFLOW_CHECKPOINTS = os.getenv("WORKFLOW_CHECKPOINTS", "true").lower() in ("1", "true", "yes")
+
+SUMMARY_PROJECTION = {"state": 0}
+
+def new_run_id():
+    return uuid.uuid4().hex
+
+def format_checkpoint(checkpoint):
+    if checkpoint is None:
+        return None
+    return {"checkpoint_id": str(checkpoint.pop("_id")), **checkpoint}
+
+def save_checkpoint(run_id, parent_id, hop, selected_workflow, state, current_nodes, workflow_started, decision=None, usage=None, agent_outputs=None, final=None):
+    from langchain_core.messages import messages_to_dict
+
+    checkpoint = {
+        "run_id": run_id,
+        "parent_id": parent_id,
+        "hop": hop,
+        "workflow_id": selected_workflow.get("workflow_id"),
+        "workflow_name": selected_workflow.get("workflow_name"),
+        "state": messages_to_dict(state),
+        "current_nodes": list(current_nodes),
+        "workflow_started": workflow_started,
+        "decision": dict(decision) if decision else None,
+        "usage": usage,
+        "agent_outputs": agent_outputs or {},
+        "final": final,
+        "created_at": time.time()
+    }
+    with telemetry.span("checkpoint.save", hop=hop):
+        result = get_db()['checkpoints'].insert_one(checkpoint)
+    return str(result.inserted_id)
+
+def load_checkpoint(checkpoint_id):
+    from bson import ObjectId
+    from bson.errors import InvalidId
+
+    try:
+        return format_checkpoint(get_db()['checkpoints'].find_one({"_id": ObjectId(checkpoint_id)}))
+    except InvalidId:
+        return None
+
+def latest_checkpoint(run_id):
+    return format_checkpoint(get_db()['checkpoints'].find_one({"run_id": run_id}, sort=[("hop", -1), ("created_at", -1)]))
+
+def list_checkpoints(run_id, include_state=False):
+    cursor = get_db()['checkpoints'].find({"run_id": run_id}, None if include_state else SUMMARY_PROJECTION).sort([("hop", 1), ("created_at", 1)])
+    return [format_checkpoint(checkpoint) for checkpoint in cursor]
+
+def restore_state(checkpoint):
+    from langchain_core.messages import messages_from_dict
+
+    return messages_from_dict(checkpoint["state"])
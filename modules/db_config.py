@@ -1,9 +1,35 @@
-
-from pymongo import MongoClient
 from dotenv import load_dotenv
+import threading
 import os
 
 load_dotenv()
 
-client = MongoClient(os.getenv('MONGODB_URI'))
-db = client['agentOrchestratorDB']
\ No newline at end of file
+_db = None
+_async_db = None
+_async_db_set = False
+_db_lock = threading.Lock()
+
+def get_db():
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                from pymongo import MongoClient
+                client = MongoClient(os.getenv('MONGODB_URI'))
+                _db = client['agentOrchestratorDB']
+    return _db
+
+def get_async_db():
+    global _async_db, _async_db_set
+    if not _async_db_set:
+        with _db_lock:
+            if not _async_db_set:
+                from motor.motor_asyncio import AsyncIOMotorClient
+                _async_db = AsyncIOMotorClient(os.getenv('MONGODB_URI'))['agentOrchestratorDB']
+                _async_db_set = True
+    return _async_db
+
+def set_db(database, async_database=None):
+    global _db, _async_db, _async_db_set
+    _db = database
+    _async_db, _async_db_set = async_database, True
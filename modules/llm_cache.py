@@ -0,0 +1,266 @@
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from modules import telemetry
+from collections import OrderedDict
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+import threading
+import warnings
+import hashlib
+import sqlite3
+import json
+import math
+import time
+import os
+
+load_dotenv()
+
+PENDING_EMBEDDINGS_SIZE = 1024
+
+llm_cache_stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+class SQLiteCacheStore:
+    def __init__(self, path, max_entries):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                partition_key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                embedding TEXT,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed_at ON llm_cache (accessed_at)")
+        self.connection.commit()
+
+    def get(self, key, min_created_at):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND created_at >= ?", (key, min_created_at)
+            ).fetchone()
+            if row is not None:
+                self.connection.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                self.connection.commit()
+        return row[0] if row else None
+
+    def put(self, key, partition, value, embedding):
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (key, partition, value, json.dumps(embedding) if embedding else None, now, now)
+            )
+            evicted = self.connection.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+            self.connection.commit()
+        return evicted
+
+    def embeddings(self, min_created_at):
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT key, partition_key, embedding FROM llm_cache WHERE embedding IS NOT NULL AND created_at >= ?", (min_created_at,)
+            ).fetchall()
+        return [(key, partition, json.loads(embedding)) for key, partition, embedding in rows]
+
+    def clear(self):
+        with self.lock:
+            self.connection.execute("DELETE FROM llm_cache")
+            self.connection.commit()
+
+def _as_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc)
+
+class MongoCacheStore:
+    def __init__(self, collection, max_entries, ttl):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.collection.create_index("accessed_at")
+        self.collection.delete_many({"created_at": {"$not": {"$type": "date"}}})
+        self._ensure_ttl_index(ttl)
+
+    def _ensure_ttl_index(self, ttl):
+        existing = self.collection.index_information().get("created_at_1")
+        if existing is not None and existing.get("expireAfterSeconds") == (ttl or None):
+            return
+        if existing is not None:
+            self.collection.drop_index("created_at_1")
+        if ttl:
+            self.collection.create_index("created_at", expireAfterSeconds=ttl)
+
+    def get(self, key, min_created_at):
+        document = self.collection.find_one_and_update(
+            {"_id": key, "created_at": {"$gte": _as_datetime(min_created_at)}},
+            {"$set": {"accessed_at": time.time()}},
+            {"value": 1}
+        )
+        return document["value"] if document else None
+
+    def put(self, key, partition, value, embedding):
+        now = time.time()
+        self.collection.replace_one(
+            {"_id": key},
+            {"partition_key": partition, "value": value, "embedding": embedding, "created_at": _as_datetime(now), "accessed_at": now},
+            upsert=True
+        )
+        overflow = self.collection.estimated_document_count() - self.max_entries
+        if overflow <= 0:
+            return 0
+        stale_keys = [document["_id"] for document in self.collection.find({}, {"_id": 1}).sort("accessed_at", 1).limit(overflow)]
+        return self.collection.delete_many({"_id": {"$in": stale_keys}}).deleted_count
+
+    def embeddings(self, min_created_at):
+        cursor = self.collection.find(
+            {"embedding": {"$ne": None}, "created_at": {"$gte": _as_datetime(min_created_at)}},
+            {"partition_key": 1, "embedding": 1}
+        )
+        return [(document["_id"], document["partition_key"], document["embedding"]) for document in cursor]
+
+    def clear(self):
+        self.collection.delete_many({})
+
+def _cosine_similarity(left, right):
+    dot = sum(a * b for a, b in zip(left, right))
+    norm = math.sqrt(sum(a * a for a in left)) * math.sqrt(sum(b * b for b in right))
+    return dot / norm if norm else 0.0
+
+class ResponseCache(BaseCache):
+    def __init__(self, store, ttl=0, embeddings=None, similarity_threshold=0.97):
+        self.store = store
+        self.ttl = ttl
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self.vector_index = None
+        self.vector_index_lock = threading.Lock()
+        self.pending_embeddings = OrderedDict()
+
+    def _key(self, prompt, llm_string):
+        return hashlib.sha256(f"{llm_string}\n{prompt}".encode('utf-8')).hexdigest()
+
+    def _prompt_parts(self, prompt):
+        try:
+            messages = json.loads(prompt)
+        except ValueError:
+            return "", prompt
+        if not isinstance(messages, list):
+            return "", prompt
+
+        system_parts, conversation_parts = [], []
+        for message in messages:
+            if not isinstance(message, dict):
+                continue
+            content = str(message.get("kwargs", {}).get("content", ""))
+            if message.get("id", [""])[-1] == "SystemMessage":
+                system_parts.append(content)
+            else:
+                conversation_parts.append(content)
+        return "\n".join(system_parts), "\n".join(conversation_parts)
+
+    def _semantic_key(self, prompt, llm_string):
+        system_text, conversation_text = self._prompt_parts(prompt)
+        partition = hashlib.sha256(f"{llm_string}\n{system_text}".encode('utf-8')).hexdigest()
+        return partition, conversation_text
+
+    def _min_created_at(self):
+        return time.time() - self.ttl if self.ttl else 0
+
+    def _load_vector_index(self):
+        with self.vector_index_lock:
+            if self.vector_index is None:
+                self.vector_index = self.store.embeddings(self._min_created_at())
+            return self.vector_index
+
+    def _semantic_lookup(self, partition, embedding):
+        best_key, best_similarity = None, self.similarity_threshold
+        for key, candidate_partition, candidate in self._load_vector_index():
+            if candidate_partition != partition:
+                continue
+            similarity = _cosine_similarity(embedding, candidate)
+            if similarity >= best_similarity:
+                best_key, best_similarity = key, similarity
+        return best_key
+
+    def _remember_embedding(self, key, embedding):
+        with self.vector_index_lock:
+            self.pending_embeddings[key] = embedding
+            while len(self.pending_embeddings) > PENDING_EMBEDDINGS_SIZE:
+                self.pending_embeddings.popitem(last=False)
+
+    def _take_embedding(self, key, conversation_text):
+        with self.vector_index_lock:
+            embedding = self.pending_embeddings.pop(key, None)
+        return embedding if embedding is not None else self.embeddings.embed_query(conversation_text)
+
+    def lookup(self, prompt, llm_string):
+        key = self._key(prompt, llm_string)
+        value = self.store.get(key, self._min_created_at())
+        if value is None and self.embeddings is not None:
+            partition, conversation_text = self._semantic_key(prompt, llm_string)
+            embedding = self.embeddings.embed_query(conversation_text)
+            similar_key = self._semantic_lookup(partition, embedding)
+            if similar_key is not None:
+                value = self.store.get(similar_key, self._min_created_at())
+                if value is not None:
+                    llm_cache_stats["semantic_hits"] += 1
+            if value is None:
+                self._remember_embedding(key, embedding)
+
+        if value is None:
+            llm_cache_stats["misses"] += 1
+            telemetry.increment("llm_cache_misses")
+            return None
+        llm_cache_stats["hits"] += 1
+        telemetry.increment("llm_cache_hits")
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", LangChainBetaWarning)
+            return loads(value)
+
+    def update(self, prompt, llm_string, return_val):
+        key = self._key(prompt, llm_string)
+        partition, conversation_text = self._semantic_key(prompt, llm_string)
+        embedding = self._take_embedding(key, conversation_text) if self.embeddings is not None else None
+
+        evicted = self.store.put(key, partition, dumps(return_val), embedding)
+        llm_cache_stats["writes"] += 1
+        llm_cache_stats["evictions"] += evicted
+
+        if embedding is not None:
+            with self.vector_index_lock:
+                self.vector_index = None if evicted else (self.vector_index or []) + [(key, partition, embedding)]
+
+    def clear(self, **kwargs):
+        self.store.clear()
+        with self.vector_index_lock:
+            self.vector_index = None
+
+def build_llm_cache():
+    mode = os.getenv("LLM_CACHE", "off").lower()
+    if mode not in ("exact", "semantic"):
+        return None
+
+    ttl = int(os.getenv("LLM_CACHE_TTL", "0"))
+    max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+
+    if os.getenv("LLM_CACHE_BACKEND", "sqlite").lower() == "mongodb":
+        from modules.db_config import get_db
+        store = MongoCacheStore(get_db()['llm_cache'], max_entries, ttl)
+    else:
+        store = SQLiteCacheStore(os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite"), max_entries)
+
+    embeddings = None
+    if mode == "semantic":
+        from langchain_openai import OpenAIEmbeddings
+        embeddings = OpenAIEmbeddings(model=os.getenv("LLM_CACHE_EMBEDDING_MODEL", "text-embedding-3-small"))
+
+    return ResponseCache(
+        store,
+        ttl=ttl,
+        embeddings=embeddings,
+        similarity_threshold=float(os.getenv("LLM_CACHE_SIMILARITY", "0.97"))
+    )
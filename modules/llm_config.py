@@ -1,9 +1,100 @@
-from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
+import threading
+import os
 
 load_dotenv()
 
-llm = ChatOpenAI(
-    model="gpt-4o-mini",
-    temperature=0.3
-)
\ No newline at end of file
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.3"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+
+ROLE_MODELS = {
+    "supervisor": os.getenv("SUPERVISOR_MODEL") or LLM_MODEL,
+    "agent": os.getenv("AGENT_MODEL") or LLM_MODEL,
+    "tools": os.getenv("TOOL_TYPING_MODEL") or LLM_MODEL,
+    "summary": os.getenv("SUMMARY_MODEL") or LLM_MODEL,
+}
+ESCALATION_MODEL = os.getenv("ESCALATION_MODEL", "gpt-4o")
+SUPERVISOR_ADAPTIVE = os.getenv("SUPERVISOR_ADAPTIVE", "false").lower() in ("1", "true", "yes")
+SUPERVISOR_MIN_CONFIDENCE = float(os.getenv("SUPERVISOR_MIN_CONFIDENCE", "0.6"))
+
+_models = {}
+_override = None
+_models_lock = threading.Lock()
+_cache = None
+_cache_built = False
+
+def normalize_models(models):
+    models = dict(models or {})
+    models["supervisor"] = models.get("supervisor") or ROLE_MODELS["supervisor"]
+    models["escalation"] = models.get("escalation") or ESCALATION_MODEL
+    models["adaptive"] = bool(models.get("adaptive", SUPERVISOR_ADAPTIVE))
+    models["min_confidence"] = float(models.get("min_confidence") or SUPERVISOR_MIN_CONFIDENCE)
+    if not 0 <= models["min_confidence"] <= 1:
+        raise ValueError(f"min_confidence must be between 0 and 1, got {models['min_confidence']}")
+    return models
+
+def model_for(role, document=None):
+    document = document or {}
+    if role == "agent" and document.get("model"):
+        return document["model"]
+    if role == "supervisor":
+        return normalize_models(document.get("models"))["supervisor"]
+    return ROLE_MODELS[role]
+
+def _shared_cache():
+    global _cache, _cache_built
+    if not _cache_built:
+        from modules.llm_cache import build_llm_cache
+        _cache, _cache_built = build_llm_cache(), True
+    return _cache
+
+def _build_model(model):
+    from modules.llm_scheduler import event_hooks, async_event_hooks
+    from langchain_openai import ChatOpenAI
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+    )
+    timeout = httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+    return ChatOpenAI(
+        model=model,
+        temperature=LLM_TEMPERATURE,
+        cache=_shared_cache(),
+        max_retries=LLM_MAX_RETRIES,
+        http_client=httpx.Client(limits=limits, timeout=timeout, event_hooks=event_hooks(model)),
+        http_async_client=httpx.AsyncClient(limits=limits, timeout=timeout, event_hooks=async_event_hooks(model))
+    )
+
+def get_llm(model=None):
+    model = model or LLM_MODEL
+    llm = _models.get(model)
+    if llm is not None:
+        return llm
+    if _override is not None:
+        return _override
+    with _models_lock:
+        llm = _models.get(model)
+        if llm is None:
+            llm = _models[model] = _build_model(model)
+    return llm
+
+def set_llm(llm, model=None):
+    global _override
+    with _models_lock:
+        if model is None:
+            _override = llm
+        else:
+            _models[model] = llm
+
+def registered_models():
+    with _models_lock:
+        return sorted(_models)
@@ -0,0 +1,221 @@
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from modules import telemetry
+import contextvars
+import threading
+import itertools
+import asyncio
+import random
+import heapq
+import time
+import os
+
+load_dotenv()
+
+LLM_RPM = int(os.getenv("LLM_RPM", "0"))
+LLM_TPM = int(os.getenv("LLM_TPM", "0"))
+LLM_BURST_SECONDS = float(os.getenv("LLM_BURST_SECONDS", "1"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "60"))
+LLM_BACKOFF_JITTER = float(os.getenv("LLM_BACKOFF_JITTER", "0.5"))
+SCHEDULER_POLL_INTERVAL = 0.01
+
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+llm_priority = contextvars.ContextVar("llm_priority", default="interactive")
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+@contextmanager
+def priority(level):
+    if level not in PRIORITIES:
+        raise ValueError(f"Unknown LLM priority: {level}")
+    token = llm_priority.set(level)
+    try:
+        yield
+    finally:
+        llm_priority.reset(token)
+
+class TokenBucket:
+    def __init__(self, per_minute, burst_seconds=None):
+        self.rate = per_minute / 60
+        self.capacity = max(self.rate * (burst_seconds or LLM_BURST_SECONDS), 1) if per_minute else 0
+        self.level = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        if self.capacity:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        if not self.capacity:
+            return 0.0
+        return max(min(amount, self.capacity) - self.level, 0) / self.rate
+
+    def take(self, amount):
+        if self.capacity:
+            self.level -= min(amount, self.capacity)
+
+    def sync(self, remaining):
+        if self.capacity:
+            self.level = min(self.level, remaining)
+
+def _retry_after(headers):
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        return float(headers.get("retry-after") or 0)
+    except ValueError:
+        return 0.0
+
+def estimate_tokens(request):
+    return len(request.content) // 4
+
+class RequestScheduler:
+    def __init__(self, model, requests_per_minute=None, tokens_per_minute=None):
+        self.model = model
+        self.lock = threading.Lock()
+        self.requests = TokenBucket(LLM_RPM if requests_per_minute is None else requests_per_minute)
+        self.tokens = TokenBucket(LLM_TPM if tokens_per_minute is None else tokens_per_minute)
+        self.waiters = []
+        self.sequence = itertools.count()
+        self.paused_until = 0.0
+        self.strikes = 0
+        self.stats = {"requests": 0, "queued": 0, "rate_limited": 0, "retries": 0, "wait_ms": 0.0}
+
+    def _enqueue(self):
+        ticket = (PRIORITIES[llm_priority.get()], next(self.sequence))
+        with self.lock:
+            heapq.heappush(self.waiters, ticket)
+        return ticket
+
+    def _dequeue(self, ticket):
+        with self.lock:
+            if ticket in self.waiters:
+                self.waiters.remove(ticket)
+                heapq.heapify(self.waiters)
+
+    def _try_acquire(self, ticket, tokens):
+        with self.lock:
+            if self.waiters[0] != ticket:
+                return SCHEDULER_POLL_INTERVAL
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            wait = max(self.paused_until - now, self.requests.wait_time(1), self.tokens.wait_time(tokens))
+            if wait > 0:
+                return wait
+            heapq.heappop(self.waiters)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.stats["requests"] += 1
+            return 0
+
+    def _record_wait(self, ticket, start_ns):
+        end_ns = time.time_ns()
+        with self.lock:
+            self.stats["queued"] += 1
+            self.stats["wait_ms"] += (end_ns - start_ns) / 1e6
+        telemetry.increment("llm_queued")
+        telemetry.record_span("llm.queue", start_ns, end_ns, model=self.model, priority=ticket[0])
+
+    def acquire(self, tokens=0):
+        ticket = self._enqueue()
+        start_ns = time.time_ns()
+        waited = False
+        try:
+            while (wait := self._try_acquire(ticket, tokens)) > 0:
+                waited = True
+                time.sleep(min(wait, SCHEDULER_POLL_INTERVAL * 10))
+        except BaseException:
+            self._dequeue(ticket)
+            raise
+        if waited:
+            self._record_wait(ticket, start_ns)
+
+    async def aacquire(self, tokens=0):
+        ticket = self._enqueue()
+        start_ns = time.time_ns()
+        waited = False
+        try:
+            while (wait := self._try_acquire(ticket, tokens)) > 0:
+                waited = True
+                await asyncio.sleep(min(wait, SCHEDULER_POLL_INTERVAL * 10))
+        except BaseException:
+            self._dequeue(ticket)
+            raise
+        if waited:
+            self._record_wait(ticket, start_ns)
+
+    def record_response(self, status_code, headers):
+        with self.lock:
+            now = time.monotonic()
+            if status_code == 429:
+                self.stats["rate_limited"] += 1
+                if now >= self.paused_until:
+                    self.strikes += 1
+                    backoff = min(LLM_BACKOFF_MAX, max(_retry_after(headers), LLM_BACKOFF_BASE * 2 ** (self.strikes - 1)))
+                    self.paused_until = now + backoff * random.uniform(1, 1 + LLM_BACKOFF_JITTER)
+            elif status_code < 400:
+                self.strikes = 0
+
+            for bucket, header in ((self.requests, "x-ratelimit-remaining-requests"), (self.tokens, "x-ratelimit-remaining-tokens")):
+                try:
+                    bucket.sync(float(headers[header]))
+                except (KeyError, ValueError):
+                    pass
+        if status_code == 429:
+            telemetry.increment("llm_rate_limited")
+
+    def before_request(self, request):
+        if request.headers.get("x-stainless-retry-count", "0") != "0":
+            self.stats["retries"] += 1
+        self.acquire(estimate_tokens(request))
+
+    def after_response(self, response):
+        self.record_response(response.status_code, response.headers)
+
+    async def abefore_request(self, request):
+        if request.headers.get("x-stainless-retry-count", "0") != "0":
+            self.stats["retries"] += 1
+        await self.aacquire(estimate_tokens(request))
+
+    async def aafter_response(self, response):
+        self.record_response(response.status_code, response.headers)
+
+def get_scheduler(model):
+    with _schedulers_lock:
+        scheduler = _schedulers.get(model)
+        if scheduler is None:
+            scheduler = _schedulers[model] = RequestScheduler(model)
+        return scheduler
+
+def configure_scheduler(model, requests_per_minute=None, tokens_per_minute=None):
+    with _schedulers_lock:
+        scheduler = _schedulers[model] = RequestScheduler(model, requests_per_minute, tokens_per_minute)
+        return scheduler
+
+def get_scheduler_stats():
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+    return {
+        scheduler.model: {**scheduler.stats, "waiting": len(scheduler.waiters), "paused_for": max(scheduler.paused_until - time.monotonic(), 0)}
+        for scheduler in schedulers
+    }
+
+def event_hooks(model):
+    return {
+        "request": [lambda request: get_scheduler(model).before_request(request)],
+        "response": [lambda response: get_scheduler(model).after_response(response)]
+    }
+
+def async_event_hooks(model):
+    async def before_request(request):
+        await get_scheduler(model).abefore_request(request)
+
+    async def after_response(response):
+        await get_scheduler(model).aafter_response(response)
+
+    return {"request": [before_request], "response": [after_response]}
@@ -0,0 +1,148 @@
+from modules.db_config import get_db
+from modules import telemetry
+from collections import OrderedDict
+import threading
+import copy
+import time
+import os
+
+REPOSITORY_CACHE_SIZE = int(os.getenv("REPOSITORY_CACHE_SIZE", "1024"))
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "50"))
+REPOSITORY_WATCH_MAX_BACKOFF = float(os.getenv("REPOSITORY_WATCH_MAX_BACKOFF", "60"))
+CHANGE_STREAMS_UNSUPPORTED = 40573
+
+PROJECTIONS = {
+    "agents": {"name": 1, "description": 1, "prompt": 1, "tools": 1, "model": 1},
+    "tools": {"name": 1, "description": 1, "tool_path": 1, "execution": 1, "memoize": 1},
+    "workflows": {"workflow_name": 1, "workflow_description": 1, "workflow": 1, "state_policy": 1, "routing": 1, "models": 1, "index": 1},
+}
+
+INDEXES = {
+    "agents": [[("name", 1)]],
+    "tools": [[("name", 1)], [("tool_path", 1)], [("source_path", 1)]],
+    "workflows": [[("workflow_name", 1)]],
+    "checkpoints": [[("run_id", 1), ("hop", -1), ("created_at", -1)]],
+    "runs": [[("run_id", 1)], [("workflow_id", 1), ("started_at", -1)], [("started_at", -1)]],
+}
+
+_documents = OrderedDict()
+_documents_lock = threading.Lock()
+repository_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+def ensure_indexes():
+    for collection_name, indexes in INDEXES.items():
+        for keys in indexes:
+            get_db()[collection_name].create_index(keys)
+
+def _cache_key(collection_name, document_id, projection):
+    return (collection_name, str(document_id), tuple(sorted((projection or {}).items())))
+
+def _cache_put(key, document):
+    with _documents_lock:
+        _documents[key] = document
+        _documents.move_to_end(key)
+        while len(_documents) > REPOSITORY_CACHE_SIZE:
+            _documents.popitem(last=False)
+
+def get_documents(collection_name, document_ids, projection=None):
+    projection = projection or PROJECTIONS.get(collection_name)
+    documents = {}
+    missing_ids = []
+
+    with _documents_lock:
+        for document_id in document_ids:
+            key = _cache_key(collection_name, document_id, projection)
+            if key in _documents:
+                _documents.move_to_end(key)
+                documents[str(document_id)] = _documents[key]
+                repository_stats["hits"] += 1
+            else:
+                missing_ids.append(str(document_id))
+                repository_stats["misses"] += 1
+
+    telemetry.increment("repository_cache_hits", len(document_ids) - len(missing_ids))
+    if missing_ids:
+        telemetry.increment("repository_cache_misses", len(missing_ids))
+        with telemetry.span("mongo.lookup", collection=collection_name, documents=len(missing_ids)):
+            from bson import ObjectId
+
+            cursor = get_db()[collection_name].find(
+                {"_id": {"$in": [ObjectId(document_id) for document_id in dict.fromkeys(missing_ids)]}},
+                projection
+            )
+            for document in cursor:
+                document_id = str(document["_id"])
+                documents[document_id] = document
+                _cache_put(_cache_key(collection_name, document_id, projection), document)
+
+    return [copy.deepcopy(documents[str(document_id)]) for document_id in document_ids if str(document_id) in documents]
+
+def get_document(collection_name, document_id, projection=None):
+    documents = get_documents(collection_name, [document_id], projection)
+    return documents[0] if documents else None
+
+def fetch_page(collection_name, after_id=None, page_size=None, projection=None):
+    from bson import ObjectId
+
+    page_size = page_size or PAGE_SIZE
+    query = {} if after_id is None else {"_id": {"$gt": ObjectId(after_id)}}
+    cursor = get_db()[collection_name].find(query, projection or PROJECTIONS.get(collection_name)).sort("_id", 1).limit(page_size)
+
+    documents = list(cursor)
+    next_after_id = documents[-1]["_id"] if len(documents) == page_size else None
+    return documents, next_after_id
+
+def iter_documents(collection_name, projection=None, page_size=None):
+    after_id = None
+    while True:
+        documents, after_id = fetch_page(collection_name, after_id, page_size, projection)
+        yield from documents
+        if after_id is None:
+            break
+
+def invalidate(collection_name=None, document_id=None):
+    with _documents_lock:
+        stale_keys = [
+            key for key in _documents
+            if (collection_name is None or key[0] == collection_name)
+            and (document_id is None or key[1] == str(document_id))
+        ]
+        for key in stale_keys:
+            del _documents[key]
+        repository_stats["invalidations"] += len(stale_keys)
+
+def watch_changes():
+    from pymongo.errors import PyMongoError, OperationFailure
+
+    pipeline = [{"$match": {"ns.coll": {"$in": list(PROJECTIONS)}}}]
+    backoff = 1
+    while True:
+        try:
+            with get_db().watch(pipeline) as stream:
+                backoff = 1
+                for change in stream:
+                    if "documentKey" in change:
+                        invalidate(change["ns"]["coll"], change["documentKey"]["_id"])
+                    else:
+                        invalidate(change.get("ns", {}).get("coll"))
+        except OperationFailure as error:
+            if error.code == CHANGE_STREAMS_UNSUPPORTED:
+                invalidate()
+                return
+        except PyMongoError:
+            pass
+        invalidate()
+        time.sleep(backoff)
+        backoff = min(backoff * 2, REPOSITORY_WATCH_MAX_BACKOFF)
+
+def _init_repository():
+    from pymongo.errors import PyMongoError
+
+    try:
+        ensure_indexes()
+    except PyMongoError:
+        pass
+    watch_changes()
+
+def init_repository():
+    threading.Thread(target=_init_repository, name="repository-init", daemon=True).start()
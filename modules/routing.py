@@ -0,0 +1,79 @@
+import re
+
+FORCED_INSTRUCTIONS = """
+Continue the user's task: {task}
+Build on the output of the previous agent(s) in the conversation and complete your part of the task.
+"""
+
+def normalize_routing(routing):
+    routing = dict(routing or {})
+    routing["fast_path"] = routing.get("fast_path", True)
+    routing["rules"] = routing.get("rules") or []
+    return routing
+
+def successors(selected_workflow, current_nodes):
+    connects = {node["agent_id"]: node.get("connects", []) for node in selected_workflow["workflow"]}
+    return list(dict.fromkeys(node for current_node in current_nodes for node in connects.get(current_node, [])))
+
+def _last_responses(state, count):
+    from langchain_core.messages import AIMessage
+
+    return [message for message in state if isinstance(message, AIMessage) and message.name != "supervisor"][-count:]
+
+def _decision(next_nodes, reasoning, instructions="", direct_response=None):
+    return {
+        "next_nodes": next_nodes,
+        "reasoning": reasoning,
+        "instructions": instructions,
+        "direct_response": direct_response,
+        "workflow_started": True
+    }
+
+def match_rule(rules, current_nodes, next_candidates, state):
+    content = "\n".join(str(message.content) for message in _last_responses(state, len(current_nodes)))
+    for rule in rules:
+        targets = rule["to"] if isinstance(rule["to"], list) else [rule["to"]]
+        if (rule.get("from") in current_nodes
+            and all(target == "FINISH" or target in next_candidates for target in targets)
+            and re.search(rule["pattern"], content, flags=re.IGNORECASE)):
+            return targets
+    return None
+
+def forced_route(selected_workflow, current_nodes, state, routing=None):
+    routing = normalize_routing(routing or selected_workflow.get("routing"))
+    if not routing["fast_path"] or not current_nodes:
+        return None
+
+    task = state[0].content if state else ""
+    next_candidates = successors(selected_workflow, current_nodes)
+
+    if not next_candidates:
+        final_responses = _last_responses(state, len(current_nodes))
+        return _decision(
+            ["FINISH"],
+            "The previous node(s) have no outgoing connections.",
+            direct_response="\n\n".join(str(message.content) for message in final_responses)
+        )
+
+    if len(next_candidates) == 1:
+        return _decision(
+            next_candidates,
+            "The previous node(s) connect to exactly one node.",
+            FORCED_INSTRUCTIONS.format(task=task).strip()
+        )
+
+    targets = match_rule(routing["rules"], current_nodes, next_candidates, state)
+    if targets is None:
+        return None
+    if targets == ["FINISH"]:
+        final_responses = _last_responses(state, len(current_nodes))
+        return _decision(
+            targets,
+            "A routing rule finished the workflow.",
+            direct_response="\n\n".join(str(message.content) for message in final_responses)
+        )
+    return _decision(
+        [target for target in targets if target != "FINISH"],
+        "A routing rule selected the next node(s).",
+        FORCED_INSTRUCTIONS.format(task=task).strip()
+    )
@@ -0,0 +1,232 @@
+from modules.db_config import get_db, get_async_db
+from modules import telemetry
+from dotenv import load_dotenv
+import threading
+import asyncio
+import atexit
+import queue
+import time
+import sys
+import os
+
+load_dotenv()
+
+RUN_LOG = os.getenv("RUN_LOG", "true").lower() in ("1", "true", "yes")
+RUN_LOG_BUFFER_SIZE = int(os.getenv("RUN_LOG_BUFFER_SIZE", "10000"))
+RUN_LOG_BATCH_SIZE = int(os.getenv("RUN_LOG_BATCH_SIZE", "500"))
+RUN_LOG_FLUSH_INTERVAL = float(os.getenv("RUN_LOG_FLUSH_INTERVAL", "1"))
+
+SUMMARY_PROJECTION = {"_id": 0, "messages": 0, "hops": 0}
+
+_FLUSH = object()
+_STOP = object()
+
+run_log_stats = {"queued": 0, "written": 0, "batches": 0, "dropped": 0, "errors": 0}
+
+async def _abulk_write(collection, batch):
+    await collection.bulk_write(batch, ordered=True)
+
+class RunLogWriter:
+    def __init__(self, buffer_size, batch_size, flush_interval):
+        self.buffer = queue.Queue(maxsize=buffer_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="run-log-writer", daemon=True)
+                self.thread.start()
+                atexit.register(self.close)
+
+    def submit(self, operation):
+        if self.thread is None:
+            self.start()
+        try:
+            self.buffer.put_nowait(operation)
+        except queue.Full:
+            run_log_stats["dropped"] += 1
+            telemetry.increment("run_log_dropped")
+            return False
+        run_log_stats["queued"] += 1
+        return True
+
+    def flush(self):
+        if self.thread is not None and self.thread.is_alive():
+            self.buffer.put(_FLUSH)
+            self.buffer.join()
+
+    def close(self):
+        if self.thread is not None and self.thread.is_alive():
+            self.buffer.put(_STOP)
+            self.thread.join()
+
+    def _next_batch(self):
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            try:
+                operation = self.buffer.get(timeout=None if deadline is None else max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if operation is _FLUSH or operation is _STOP:
+                return batch, operation
+            batch.append(operation)
+            deadline = deadline or time.monotonic() + self.flush_interval
+        return batch, None
+
+    def _write(self, loop, batch):
+        async_db = get_async_db()
+        try:
+            if async_db is not None:
+                loop.run_until_complete(_abulk_write(async_db['runs'], batch))
+            else:
+                get_db()['runs'].bulk_write(batch, ordered=True)
+            run_log_stats["written"] += len(batch)
+            run_log_stats["batches"] += 1
+        except Exception as error:
+            run_log_stats["errors"] += 1
+            print(f"\n❌ Failed to write {len(batch)} run log update(s): {type(error).__name__}: {error} ❌", file=sys.stderr)
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                batch, signal = self._next_batch()
+                if batch:
+                    self._write(loop, batch)
+                for _ in range(len(batch) + (signal is not None)):
+                    self.buffer.task_done()
+                if signal is _STOP:
+                    return
+        finally:
+            loop.close()
+
+_writer = RunLogWriter(RUN_LOG_BUFFER_SIZE, RUN_LOG_BATCH_SIZE, RUN_LOG_FLUSH_INTERVAL)
+
+def flush_run_log():
+    _writer.flush()
+
+def _update(run_id, update, upsert=False):
+    from pymongo import UpdateOne
+
+    _writer.submit(UpdateOne({"run_id": run_id}, update, upsert=upsert))
+
+def _message(role, content, name=None):
+    return {"role": role, "name": name, "content": content, "at": time.time()}
+
+class RunRecorder:
+    def __init__(self, run_id, selected_workflow, user_prompt, checkpoint=None):
+        self.run_id = run_id
+        self.hop = checkpoint["hop"] if checkpoint else 0
+        self.current_hop = None
+        self.messages = []
+        self.agents = {}
+        self.final = None
+        self.started = time.time()
+
+        update = {
+            "$setOnInsert": {
+                "run_id": run_id,
+                "workflow_id": selected_workflow.get("workflow_id"),
+                "workflow_name": selected_workflow.get("workflow_name"),
+                "forked_from": checkpoint["checkpoint_id"] if checkpoint and checkpoint["run_id"] != run_id else None,
+                "started_at": self.started
+            },
+            "$set": {"status": "running", "updated_at": self.started}
+        }
+        if user_prompt:
+            update["$push"] = {"messages": _message("user", user_prompt, "user")}
+        _update(run_id, update, upsert=True)
+
+    def _close_hop(self):
+        if self.current_hop is None and not self.messages:
+            return
+        now = time.time()
+        update = {"$set": {"updated_at": now}, "$push": {"messages": {"$each": self.messages}}}
+        if self.current_hop is not None:
+            self.current_hop["duration_ms"] = (now - self.current_hop["started_at"]) * 1000
+            update["$push"]["hops"] = self.current_hop
+        _update(self.run_id, update)
+        self.current_hop, self.messages = None, []
+
+    def record(self, event):
+        now = time.time()
+        if event["type"] == "supervisor":
+            self._close_hop()
+            self.hop += 1
+            decision = event["decision"]
+            self.current_hop = {
+                "hop": self.hop,
+                "started_at": now,
+                "forced": event["forced"],
+                "decision": {key: decision.get(key) for key in ("next_nodes", "reasoning", "instructions", "workflow_started", "confidence")},
+                "usage": event["usage"],
+                "agents": []
+            }
+            if decision.get("instructions") and "FINISH" not in decision["next_nodes"]:
+                self.messages.append(_message("supervisor", decision["instructions"], "supervisor"))
+        elif event["type"] == "agent_start":
+            self.agents[event["agent_id"]] = {"agent_id": event["agent_id"], "agent_name": event["agent_name"], "started_at": now, "tool_calls": []}
+        elif event["type"] == "tool_start" and event["agent_id"] in self.agents:
+            self.agents[event["agent_id"]]["tool_calls"].append(event["tool"])
+        elif event["type"] == "agent_message":
+            agent = self.agents.pop(event["agent_id"], None) or {"agent_id": event["agent_id"], "agent_name": event["agent_name"], "started_at": now, "tool_calls": []}
+            message = event["message"]
+            usage = getattr(message, "usage_metadata", None) or {}
+            agent["duration_ms"] = (now - agent["started_at"]) * 1000
+            agent["usage"] = {"prompt_tokens": usage.get("input_tokens", 0), "completion_tokens": usage.get("output_tokens", 0)}
+            if self.current_hop is not None:
+                self.current_hop["agents"].append(agent)
+            if message is not None:
+                self.messages.append(_message("agent", message.content, event["agent_name"]))
+        elif event["type"] == "final":
+            self.final = event["content"]
+            if self.current_hop is not None:
+                self.current_hop["final"] = event["content"]
+            self.messages.append(_message("final", event["content"]))
+        elif event["type"] == "checkpoint" and self.current_hop is not None:
+            self.current_hop["checkpoint_id"] = event["checkpoint_id"]
+
+    def finish(self, summary, error=None):
+        self._close_hop()
+        now = time.time()
+        if error is None:
+            status = "completed"
+        elif isinstance(error, (GeneratorExit, asyncio.CancelledError, KeyboardInterrupt)):
+            status = "cancelled"
+        else:
+            status = "failed"
+        counters = summary["counters"]
+        _update(self.run_id, {
+            "$set": {
+                "status": status,
+                "error": f"{type(error).__name__}: {error}" if status == "failed" else None,
+                "final": self.final,
+                "finished_at": now,
+                "updated_at": now,
+                "trace_id": summary["trace_id"],
+                "hop_count": self.hop
+            },
+            "$inc": {
+                "duration_ms": summary["wall_ms"],
+                "tokens.prompt": counters.get("prompt_tokens", 0),
+                "tokens.completion": counters.get("completion_tokens", 0),
+                "supervisor_calls": counters.get("supervisor_calls", 0),
+                "tool_calls": counters.get("tool_calls", 0)
+            }
+        })
+
+def start_run_log(run_id, selected_workflow, user_prompt, checkpoint=None):
+    if not RUN_LOG:
+        return None
+    return RunRecorder(run_id, selected_workflow, user_prompt, checkpoint)
+
+def get_run(run_id):
+    return get_db()['runs'].find_one({"run_id": run_id}, {"_id": 0})
+
+def list_runs(workflow_id=None, limit=20):
+    query = {"workflow_id": workflow_id} if workflow_id else {}
+    return list(get_db()['runs'].find(query, SUMMARY_PROJECTION).sort("started_at", -1).limit(limit))
@@ -0,0 +1,231 @@
+from modules.workflow_operations import astream_workflow, format_workflow, print_workflow_events
+from modules.checkpoints import load_checkpoint, latest_checkpoint, list_checkpoints
+from modules.run_log import list_runs
+from modules.repository import PROJECTIONS, get_document
+from modules.db_config import get_db
+from modules.llm_scheduler import llm_priority
+from dotenv import load_dotenv
+import threading
+import asyncio
+import json
+import time
+import sys
+import os
+
+load_dotenv()
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+_workflow_ids = {}
+_workflow_ids_lock = threading.Lock()
+
+def find_workflow(workflow_reference):
+    from bson import ObjectId
+
+    if ObjectId.is_valid(workflow_reference):
+        workflow = get_document("workflows", workflow_reference)
+        if workflow is not None:
+            return format_workflow(workflow)
+
+    with _workflow_ids_lock:
+        workflow_id = _workflow_ids.get(workflow_reference)
+    workflow = get_document("workflows", workflow_id) if workflow_id else None
+    if workflow is None:
+        workflow = get_db()['workflows'].find_one({"workflow_name": workflow_reference}, PROJECTIONS["workflows"])
+        if workflow is None:
+            return None
+        with _workflow_ids_lock:
+            _workflow_ids[workflow_reference] = str(workflow["_id"])
+    return format_workflow(workflow)
+
+def serialize_event(event):
+    if event["type"] == "agent_message":
+        message = event["message"]
+        return {**event, "message": message.content if message is not None else None}
+    return event
+
+def dumps_event(event):
+    return json.dumps(serialize_event(event), default=str, ensure_ascii=False)
+
+async def collect_events(events, on_event=None):
+    result = {"run_id": None, "response": None, "agents": [], "trace": None}
+    async for event in events:
+        if on_event is not None:
+            await on_event(event)
+        if event["type"] == "agent_message":
+            result["agents"].append(serialize_event(event))
+        elif event["type"] == "final":
+            result["response"] = event["content"]
+        elif event["type"] == "checkpoint":
+            result["run_id"] = event["run_id"]
+        elif event["type"] == "trace":
+            result["trace"] = event["summary"]
+    return result
+
+async def run_prompt(selected_workflow, user_prompt, on_event=None):
+    return await collect_events(astream_workflow(selected_workflow, user_prompt), on_event)
+
+def _checkpoint_workflow(checkpoint, reference):
+    if checkpoint is None:
+        raise LookupError(f"No checkpoint found for {reference!r}")
+    selected_workflow = find_workflow(checkpoint["workflow_id"])
+    if selected_workflow is None:
+        raise LookupError(f"Workflow {checkpoint['workflow_id']} of this run no longer exists")
+    return selected_workflow
+
+def resume_events(run_id):
+    checkpoint = latest_checkpoint(run_id)
+    return astream_workflow(_checkpoint_workflow(checkpoint, run_id), None, checkpoint, run_id)
+
+def fork_events(checkpoint_id, user_prompt=None):
+    checkpoint = load_checkpoint(checkpoint_id)
+    return astream_workflow(_checkpoint_workflow(checkpoint, checkpoint_id), user_prompt, checkpoint)
+
+async def replay_events(run_id, until_checkpoint_id=None):
+    from langchain_core.messages import AIMessage
+
+    checkpoints = await asyncio.to_thread(list_checkpoints, run_id)
+    if not checkpoints:
+        raise LookupError(f"No checkpoint found for {run_id!r}")
+
+    for checkpoint in checkpoints:
+        if checkpoint["decision"] is not None:
+            yield {"type": "supervisor", "decision": checkpoint["decision"], "usage": checkpoint["usage"], "forced": checkpoint["usage"] is None}
+        for agent_id, output in checkpoint["agent_outputs"].items():
+            event_source = {"agent_id": agent_id, "agent_name": output["agent_name"]}
+            yield {"type": "agent_start", **event_source}
+            yield {"type": "token", **event_source, "content": output["content"]}
+            yield {"type": "agent_message", **event_source, "message": AIMessage(content=output["content"], name=output["agent_name"])}
+        if checkpoint["final"] is not None:
+            yield {"type": "final", "content": checkpoint["final"]}
+        yield {"type": "checkpoint", "run_id": run_id, "checkpoint_id": checkpoint["checkpoint_id"], "hop": checkpoint["hop"]}
+        if checkpoint["checkpoint_id"] == until_checkpoint_id:
+            break
+
+def print_events(make_events):
+    async def process():
+        await print_workflow_events(make_events())
+
+    try:
+        asyncio.run(process())
+    except LookupError as error:
+        print(f"\n❌ {error}. ❌", file=sys.stderr)
+        return 1
+    return 0
+
+def display_runs(workflow_reference=None, limit=20):
+    workflow_id = None
+    if workflow_reference:
+        selected_workflow = find_workflow(workflow_reference)
+        if selected_workflow is None:
+            print(f"\n❌ No workflow found with name or ID {workflow_reference!r}. ❌", file=sys.stderr)
+            return 1
+        workflow_id = selected_workflow["workflow_id"]
+
+    print("\n\nRecent Runs:\n")
+    for run in list_runs(workflow_id, limit):
+        tokens = run.get("tokens", {})
+        started_at = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run["started_at"]))
+        print(
+            f"  - Run ID: {run['run_id']}, Workflow: {run['workflow_name']}, Status: {run['status']}, Started: {started_at}, "
+            f"Hops: {run.get('hop_count', 0)}, Tokens: {tokens.get('prompt', 0)} in / {tokens.get('completion', 0)} out, "
+            f"Duration: {run.get('duration_ms', 0) / 1000:.1f}s"
+        )
+    return 0
+
+def parse_prompt_line(line, line_number):
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        item = json.loads(line)
+    except ValueError:
+        item = line
+    if isinstance(item, str):
+        item = {"prompt": item}
+    if not isinstance(item, dict) or not isinstance(item.get("prompt"), str):
+        raise ValueError(f"Line {line_number}: expected a JSON object with a \"prompt\" string")
+    item.setdefault("id", line_number)
+    return item
+
+async def arun_batch(selected_workflow, lines, concurrency=None):
+    concurrency = max(concurrency or BATCH_CONCURRENCY, 1)
+    jobs = asyncio.Queue(maxsize=concurrency * 2)
+    results = asyncio.Queue()
+
+    async def produce():
+        line_iterator = iter(lines)
+        line_number = 0
+        try:
+            while True:
+                line = await asyncio.to_thread(next, line_iterator, None)
+                if line is None:
+                    break
+                line_number += 1
+                try:
+                    item = parse_prompt_line(line, line_number)
+                except ValueError as error:
+                    await results.put({"id": line_number, "error": str(error)})
+                    continue
+                if item is not None:
+                    await jobs.put(item)
+        finally:
+            for _ in range(concurrency):
+                await jobs.put(None)
+
+    async def work():
+        while (item := await jobs.get()) is not None:
+            started = time.perf_counter()
+            try:
+                result = await run_prompt(selected_workflow, item["prompt"])
+            except Exception as error:
+                result = {"error": f"{type(error).__name__}: {error}"}
+            await results.put({**item, **result, "elapsed_ms": (time.perf_counter() - started) * 1000})
+
+    async def drive():
+        llm_priority.set("batch")
+        try:
+            await asyncio.gather(produce(), *(work() for _ in range(concurrency)))
+        finally:
+            await results.put(None)
+
+    driver = asyncio.create_task(drive())
+    try:
+        while (result := await results.get()) is not None:
+            yield result
+        await driver
+    finally:
+        driver.cancel()
+
+def _open_input(path):
+    return sys.stdin if path in (None, "-") else open(path, encoding="utf-8")
+
+def _open_output(path):
+    return sys.stdout if path in (None, "-") else open(path, "a", encoding="utf-8")
+
+def run_batch(workflow_reference, input_path=None, output_path=None, concurrency=None):
+    selected_workflow = find_workflow(workflow_reference)
+    if selected_workflow is None:
+        print(f"\n❌ No workflow found with name or ID {workflow_reference!r}. ❌", file=sys.stderr)
+        return 1
+
+    async def process(input_file, output_file):
+        processed = failed = 0
+        async for result in arun_batch(selected_workflow, input_file, concurrency):
+            processed += 1
+            failed += "error" in result
+            output_file.write(json.dumps(result, default=str, ensure_ascii=False) + "\n")
+            output_file.flush()
+        return processed, failed
+
+    started = time.perf_counter()
+    input_file, output_file = _open_input(input_path), _open_output(output_path)
+    try:
+        processed, failed = asyncio.run(process(input_file, output_file))
+    finally:
+        for file in (input_file, output_file):
+            if file not in (sys.stdin, sys.stdout):
+                file.close()
+
+    print(f"\n✅ Processed {processed} prompt(s) with {selected_workflow['workflow_name']} in {time.perf_counter() - started:.1f}s ({failed} failed) ✅", file=sys.stderr)
+    return 1 if failed else 0
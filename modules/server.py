@@ -0,0 +1,165 @@
+from modules.runner import find_workflow, collect_events, dumps_event, resume_events, fork_events
+from modules.workflow_operations import astream_workflow, iter_workflows
+from modules.checkpoints import list_checkpoints
+from modules.run_log import get_run, run_log_stats
+from modules.tool_cache import get_tool_cache_stats
+from modules.agent_operations import get_agent_cache_stats
+from modules.repository import repository_stats
+from modules.llm_config import registered_models
+from modules.llm_scheduler import PRIORITIES, llm_priority, get_scheduler_stats
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+from dotenv import load_dotenv
+import threading
+import asyncio
+import queue
+import json
+import os
+
+load_dotenv()
+
+SERVER_CONCURRENCY = int(os.getenv("SERVER_CONCURRENCY", "16"))
+MAX_REQUEST_BYTES = 1024 * 1024
+
+_loop = None
+_slots = None
+
+def _start_loop(concurrency):
+    global _loop, _slots
+    _loop = asyncio.new_event_loop()
+    threading.Thread(target=_loop.run_forever, name="workflow-loop", daemon=True).start()
+
+    async def create_slots():
+        return asyncio.Semaphore(concurrency)
+
+    _slots = asyncio.run_coroutine_threadsafe(create_slots(), _loop).result()
+
+async def _invoke(events, on_event=None, priority="interactive"):
+    llm_priority.set(priority)
+    async with _slots:
+        return await collect_events(events, on_event)
+
+class WorkflowRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body, default=str, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _read_body(self, prompt_required=True):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_REQUEST_BYTES:
+            raise ValueError("Request body is too large")
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(body, dict) or not isinstance(body.get("prompt", None if prompt_required else ""), str):
+            raise ValueError("Expected a JSON object with a \"prompt\" string")
+        if body.setdefault("priority", "interactive") not in PRIORITIES:
+            raise ValueError(f"\"priority\" must be one of {', '.join(PRIORITIES)}")
+        return body
+
+    def do_GET(self):
+        path = urlsplit(self.path).path.rstrip("/")
+        if path == "/health":
+            self._send_json(200, {
+                "status": "ok", "agent_cache": get_agent_cache_stats(), "repository_cache": repository_stats,
+                "models": registered_models(), "llm_scheduler": get_scheduler_stats(), "run_log": run_log_stats,
+                "tool_cache": get_tool_cache_stats()
+            })
+        elif path.startswith("/runs/") and path.endswith("/checkpoints"):
+            checkpoints = list_checkpoints(unquote(path.split("/")[2]))
+            self._send_json(200 if checkpoints else 404, checkpoints or {"error": "Run not found"})
+        elif path.startswith("/runs/") and path.count("/") == 2:
+            run = get_run(unquote(path.split("/")[2]))
+            self._send_json(200 if run else 404, run or {"error": "Run not found"})
+        elif path == "/workflows":
+            self._send_json(200, [
+                {key: workflow[key] for key in ("workflow_id", "workflow_name", "workflow_description")}
+                for workflow in iter_workflows()
+            ])
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        parts = urlsplit(self.path).path.strip("/").split("/")
+        if len(parts) != 3 or (parts[0], parts[2]) not in (("workflows", "invoke"), ("runs", "resume"), ("checkpoints", "fork")):
+            self._send_json(404, {"error": "Not found"})
+            return
+        reference = unquote(parts[1])
+
+        try:
+            body = self._read_body(prompt_required=parts[0] == "workflows")
+        except ValueError as error:
+            self._send_json(400, {"error": str(error)})
+            return
+
+        try:
+            if parts[0] == "runs":
+                events = resume_events(reference)
+            elif parts[0] == "checkpoints":
+                events = fork_events(reference, body.get("prompt"))
+            else:
+                selected_workflow = find_workflow(reference)
+                if selected_workflow is None:
+                    raise LookupError(f"No workflow found with name or ID {reference!r}")
+                events = astream_workflow(selected_workflow, body["prompt"])
+        except LookupError as error:
+            self._send_json(404, {"error": str(error)})
+            return
+
+        if body.get("stream", True):
+            self._stream(events, body["priority"])
+            return
+
+        try:
+            result = asyncio.run_coroutine_threadsafe(_invoke(events, None, body["priority"]), _loop).result()
+        except Exception as error:
+            self._send_json(500, {"error": f"{type(error).__name__}: {error}"})
+            return
+        self._send_json(200, result)
+
+    def _stream(self, workflow_events, priority):
+        events = queue.Queue()
+
+        async def on_event(event):
+            events.put(dumps_event(event))
+
+        future = asyncio.run_coroutine_threadsafe(_invoke(workflow_events, on_event, priority), _loop)
+        future.add_done_callback(lambda _: events.put(None))
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            while (line := events.get()) is not None:
+                self._write_chunk(line.encode('utf-8') + b"\n")
+            error = future.exception()
+            if error is not None:
+                self._write_chunk(json.dumps({"type": "error", "error": f"{type(error).__name__}: {error}"}).encode('utf-8') + b"\n")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            future.cancel()
+            self.close_connection = True
+
+def serve(host="127.0.0.1", port=8000, concurrency=None):
+    _start_loop(concurrency or SERVER_CONCURRENCY)
+    server = ThreadingHTTPServer((host, port), WorkflowRequestHandler)
+    print(f"\n🚀 Serving workflows on http://{host}:{port} (POST /workflows/<name or id>/invoke) 🚀")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        _loop.call_soon_threadsafe(_loop.stop)
@@ -0,0 +1,95 @@
+from modules.llm_config import get_llm, model_for
+
+STATE_POLICY_MODES = ["full", "window", "tokens", "summary"]
+
+DEFAULT_LIMITS = {
+    "window": 20,
+    "tokens": 8000,
+    "summary": 12
+}
+
+SUMMARY_PROMPT = """
+Summarize the following conversation between a user, a supervisor and its agents.
+Keep every fact, decision, intermediate result and open question that later agents may need.
+Be concise and do not add anything that was not said.
+"""
+
+def normalize_state_policy(policy):
+    policy = dict(policy or {})
+    policy["mode"] = policy.get("mode") or "full"
+    if policy["mode"] not in STATE_POLICY_MODES:
+        raise ValueError(f"Unknown state policy mode: {policy['mode']}")
+    if policy["mode"] != "full":
+        policy["limit"] = int(policy.get("limit") or DEFAULT_LIMITS[policy["mode"]])
+    policy["agent_scope"] = bool(policy.get("agent_scope", False))
+    return policy
+
+def _split_task(state):
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    head = 1 if state and isinstance(state[0], HumanMessage) else 0
+    if head < len(state) and isinstance(state[head], SystemMessage) and state[head].name == "summary":
+        head += 1
+    return state[:head], state[head:]
+
+def _window(state, max_messages):
+    task, history = _split_task(state)
+    return task + history[-max_messages:] if max_messages > 0 else task
+
+def _token_budget(state, max_tokens):
+    from langchain_core.messages.utils import count_tokens_approximately
+
+    task, history = _split_task(state)
+    budget = max_tokens - count_tokens_approximately(task)
+    kept = []
+    for message in reversed(history):
+        budget -= count_tokens_approximately([message])
+        if budget < 0 and kept:
+            break
+        kept.append(message)
+    return task + kept[::-1]
+
+def supervisor_view(state, policy):
+    policy = normalize_state_policy(policy)
+    if policy["mode"] == "window":
+        return _window(state, policy["limit"])
+    if policy["mode"] == "tokens":
+        return _token_budget(state, policy["limit"])
+    return list(state)
+
+def agent_view(state, policy, agent):
+    policy = normalize_state_policy(policy)
+    view = supervisor_view(state, policy)
+    if not policy["agent_scope"]:
+        return view
+
+    from langchain_core.messages import HumanMessage, AIMessage
+
+    task, history = _split_task(view)
+    last_instruction = max((i for i, message in enumerate(history) if message.name == "supervisor"), default=None)
+    return task + [
+        message for i, message in enumerate(history)
+        if i == last_instruction
+        or isinstance(message, HumanMessage)
+        or (isinstance(message, AIMessage) and message.name == agent['agent_name'])
+    ]
+
+async def acompact_state(state, policy):
+    from langchain_core.messages import SystemMessage
+
+    policy = normalize_state_policy(policy)
+    task, history = _split_task(state)
+    if policy["mode"] != "summary" or len(history) <= policy["limit"]:
+        return state
+
+    keep_last = max(policy["limit"] // 2, 1)
+    previous_summary = [message for message in task if isinstance(message, SystemMessage)]
+    older, recent = history[:-keep_last], history[-keep_last:]
+
+    summary = await get_llm(model_for("summary")).ainvoke(
+        [SystemMessage(content=SUMMARY_PROMPT)] + previous_summary + older
+    )
+    state[:] = [message for message in task if not isinstance(message, SystemMessage)] + [
+        SystemMessage(content=f"Summary of the earlier conversation:\n{summary.content}", name="summary")
+    ] + recent
+    return state
@@ -0,0 +1,203 @@
+from contextlib import contextmanager
+from functools import lru_cache
+from dotenv import load_dotenv
+import contextvars
+import threading
+import json
+import time
+import uuid
+import os
+
+load_dotenv()
+
+TRACE_FILE = os.getenv("TRACE_FILE")
+
+_current_run = contextvars.ContextVar("telemetry_run", default=None)
+_current_span = contextvars.ContextVar("telemetry_span", default=None)
+_trace_file_lock = threading.Lock()
+
+def _new_id(length):
+    return uuid.uuid4().hex[:length]
+
+def start_run(name, **attributes):
+    run = {
+        "trace_id": uuid.uuid4().hex,
+        "name": name,
+        "attributes": attributes,
+        "started_at": time.time_ns(),
+        "spans": [],
+        "counters": {},
+        "lock": threading.Lock()
+    }
+    _current_run.set(run)
+    _current_span.set(None)
+    return run
+
+def current_run():
+    return _current_run.get()
+
+def increment(counter, amount=1, run=None):
+    run = run or _current_run.get()
+    if run is None:
+        return
+    with run["lock"]:
+        run["counters"][counter] = run["counters"].get(counter, 0) + amount
+
+def record_span(name, start_ns, end_ns, run=None, parent_id=None, **attributes):
+    run = run or _current_run.get()
+    if run is None:
+        return None
+    parent = _current_span.get()
+    recorded_span = {
+        "span_id": _new_id(16),
+        "parent_span_id": parent_id or (parent["span_id"] if parent else None),
+        "name": name,
+        "start_time_unix_nano": start_ns,
+        "end_time_unix_nano": end_ns,
+        "attributes": attributes
+    }
+    with run["lock"]:
+        run["spans"].append(recorded_span)
+    return recorded_span
+
+@contextmanager
+def span(name, **attributes):
+    run = _current_run.get()
+    if run is None:
+        yield attributes
+        return
+
+    parent = _current_span.get()
+    active_span = {"span_id": _new_id(16), "attributes": attributes}
+    token = _current_span.set(active_span)
+    start_ns = time.time_ns()
+    try:
+        yield attributes
+    except BaseException as error:
+        attributes["error"] = type(error).__name__
+        raise
+    finally:
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            _current_span.set(parent)
+        recorded_span = {
+            "span_id": active_span["span_id"],
+            "parent_span_id": parent["span_id"] if parent else None,
+            "name": name,
+            "start_time_unix_nano": start_ns,
+            "end_time_unix_nano": time.time_ns(),
+            "attributes": attributes
+        }
+        with run["lock"]:
+            run["spans"].append(recorded_span)
+
+class TelemetryCallbacks:
+    def __init__(self, run, parent_span_id=None, **attributes):
+        self.run = run
+        self.parent_span_id = parent_span_id
+        self.attributes = attributes
+        self.started = {}
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self.started[run_id] = time.time_ns()
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._finish_tool(run_id, kwargs.get("name"))
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish_tool(run_id, kwargs.get("name"), error=type(error).__name__)
+
+    def _finish_tool(self, run_id, tool_name, **attributes):
+        start_ns = self.started.pop(run_id, None)
+        if start_ns is None:
+            return
+        record_span("tool", start_ns, time.time_ns(), run=self.run, parent_id=self.parent_span_id, tool=tool_name, **self.attributes, **attributes)
+        increment("tool_calls", run=self.run)
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                increment("prompt_tokens", usage.get("input_tokens", 0), run=self.run)
+                increment("completion_tokens", usage.get("output_tokens", 0), run=self.run)
+
+@lru_cache(maxsize=None)
+def _callback_handler_class():
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    return type("TelemetryCallbackHandler", (TelemetryCallbacks, BaseCallbackHandler), {})
+
+def callback_handler(**attributes):
+    run = _current_run.get()
+    if run is None:
+        return None
+    parent = _current_span.get()
+    return _callback_handler_class()(run, parent["span_id"] if parent else None, **attributes)
+
+def summarize(run):
+    phases = {}
+    for recorded_span in run["spans"]:
+        phase = phases.setdefault(recorded_span["name"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        duration_ms = (recorded_span["end_time_unix_nano"] - recorded_span["start_time_unix_nano"]) / 1e6
+        phase["count"] += 1
+        phase["total_ms"] += duration_ms
+        phase["max_ms"] = max(phase["max_ms"], duration_ms)
+
+    return {
+        "trace_id": run["trace_id"],
+        "name": run["name"],
+        "wall_ms": (run["ended_at"] - run["started_at"]) / 1e6,
+        "phases": phases,
+        "counters": dict(run["counters"])
+    }
+
+def summary_table(summary):
+    lines = [
+        f"Trace {summary['trace_id']} - {summary['name']} - {summary['wall_ms']:.1f} ms",
+        f"{'Phase':<26}{'Count':>8}{'Total ms':>12}{'Avg ms':>10}{'Max ms':>10}"
+    ]
+    for name, phase in sorted(summary["phases"].items(), key=lambda item: -item[1]["total_ms"]):
+        lines.append(f"{name:<26}{phase['count']:>8}{phase['total_ms']:>12.1f}{phase['total_ms'] / phase['count']:>10.1f}{phase['max_ms']:>10.1f}")
+    for counter, value in sorted(summary["counters"].items()):
+        lines.append(f"{counter:<26}{value:>8}")
+    return "\n".join(lines)
+
+def _export_jsonl(run, summary):
+    with _trace_file_lock, open(TRACE_FILE, "a", encoding="utf-8") as file:
+        for recorded_span in run["spans"]:
+            file.write(json.dumps({"trace_id": run["trace_id"], **recorded_span}, default=str) + "\n")
+        file.write(json.dumps({"trace_id": run["trace_id"], "summary": summary}, default=str) + "\n")
+
+def _export_opentelemetry(run):
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return
+
+    tracer = trace.get_tracer("agentic-orchestrator")
+    root = tracer.start_span(run["name"], start_time=run["started_at"], attributes={
+        key: str(value) for key, value in run["attributes"].items()
+    })
+    otel_spans = {}
+    for recorded_span in sorted(run["spans"], key=lambda item: item["start_time_unix_nano"]):
+        parent = otel_spans.get(recorded_span["parent_span_id"], root)
+        otel_spans[recorded_span["span_id"]] = tracer.start_span(
+            recorded_span["name"],
+            context=trace.set_span_in_context(parent),
+            start_time=recorded_span["start_time_unix_nano"],
+            attributes={key: value if isinstance(value, (str, bool, int, float)) else str(value) for key, value in recorded_span["attributes"].items()}
+        )
+    for recorded_span in run["spans"]:
+        otel_spans[recorded_span["span_id"]].end(end_time=recorded_span["end_time_unix_nano"])
+    root.end(end_time=run["ended_at"])
+
+def finish_run(run):
+    run["ended_at"] = time.time_ns()
+    summary = summarize(run)
+    if TRACE_FILE:
+        _export_jsonl(run, summary)
+    _export_opentelemetry(run)
+    if _current_run.get() is run:
+        _current_run.set(None)
+    return summary
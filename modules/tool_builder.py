@@ -0,0 +1,217 @@
+from modules.tool_operations import (
+    ToolBatchParameters, tool_details, unresolved_parameters, parameter_typing_prompt,
+    batch_typed_parameters, tool_parameters, render_tool, write_tool
+)
+from modules.tool_sandbox import normalize_execution_profile
+from modules.tool_cache import normalize_memoize_policy
+from modules.agent_operations import invalidate_compiled_agent
+from modules.repository import invalidate
+from modules.llm_config import get_llm, model_for
+from modules.llm_scheduler import llm_priority
+from modules.db_config import get_db
+from modules import telemetry
+from dotenv import load_dotenv
+import hashlib
+import asyncio
+import time
+import ast
+import sys
+import os
+
+load_dotenv()
+
+TOOL_BUILD_CONCURRENCY = int(os.getenv("TOOL_BUILD_CONCURRENCY", "8"))
+TOOL_BUILD_RATE = float(os.getenv("TOOL_BUILD_RATE", "2"))
+TOOL_BUILD_BATCH_SIZE = int(os.getenv("TOOL_BUILD_BATCH_SIZE", "8"))
+
+def scan_sources(directory, recursive=False):
+    directory = os.path.abspath(directory)
+    if recursive:
+        paths = [
+            os.path.join(root, file_name)
+            for root, directories, file_names in os.walk(directory)
+            if not os.path.basename(root).startswith(("_", "."))
+            for file_name in file_names
+        ]
+    else:
+        paths = [os.path.join(directory, file_name) for file_name in os.listdir(directory)]
+    return sorted(path for path in paths if path.endswith(".py") and not os.path.basename(path).startswith("_"))
+
+def source_hash(file_content):
+    return hashlib.sha256(file_content.encode('utf-8')).hexdigest()
+
+def source_tool_name(path):
+    return os.path.splitext(os.path.basename(path))[0].replace("_", " ").replace("-", " ").title()
+
+def source_tool_description(file_content, tool_name):
+    tree = ast.parse(file_content)
+    description = ast.get_docstring(tree)
+    if not description:
+        functions = [node for node in tree.body if isinstance(node, ast.FunctionDef)]
+        description = next((ast.get_docstring(node) for node in reversed(functions) if ast.get_docstring(node)), None)
+    return " ".join((description or tool_name).split())
+
+def read_source(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        file_content = file.read()
+    tool_name = source_tool_name(path)
+    return {
+        "source_path": path,
+        "source_hash": source_hash(file_content),
+        "tool_name": tool_name,
+        "file_content": file_content
+    }
+
+def source_path_suffix(path):
+    return hashlib.sha256(path.encode('utf-8')).hexdigest()[:8]
+
+def _unchanged(source, existing):
+    return (
+        existing is not None
+        and existing.get("source_hash") == source["source_hash"]
+        and os.path.exists(existing.get("tool_path") or "")
+    )
+
+def _same_settings(existing, settings):
+    return all(existing.get(key) == value for key, value in settings.items())
+
+async def abuild_tools(paths, execution=None, concurrency=None, rate=None, force=False, batch_size=None, memoize=None):
+    from langchain_core.rate_limiters import InMemoryRateLimiter
+    from pymongo import UpdateOne
+
+    llm_priority.set("batch")
+    tools_collection = get_db()['tools']
+    settings = {}
+    if execution is not None:
+        settings["execution"] = normalize_execution_profile(execution)
+    if memoize is not None:
+        settings["memoize"] = normalize_memoize_policy(memoize)
+    slots = asyncio.Semaphore(max(concurrency or TOOL_BUILD_CONCURRENCY, 1))
+    rate = rate or TOOL_BUILD_RATE
+    rate_limiter = InMemoryRateLimiter(requests_per_second=rate, check_every_n_seconds=min(0.1, 1 / rate), max_bucket_size=1)
+    typing_llm = get_llm(model_for("tools")).with_structured_output(ToolBatchParameters)
+
+    existing_tools = {
+        tool["source_path"]: tool
+        for tool in tools_collection.find({"source_path": {"$in": paths}}, {"source_path": 1, "source_hash": 1, "tool_path": 1, "execution": 1, "memoize": 1})
+    }
+
+    async def prepare(path):
+        async with slots:
+            started = time.perf_counter()
+            try:
+                source = await asyncio.to_thread(read_source, path)
+                if not force and _unchanged(source, existing_tools.get(path)):
+                    if _same_settings(existing_tools[path], settings):
+                        return {"source_path": path, "tool_name": source["tool_name"], "status": "skipped"}
+                    return {
+                        "source_path": path,
+                        "tool_name": source["tool_name"],
+                        "status": "reconfigured",
+                        "document": {**settings, "built_at": time.time()}
+                    }
+
+                with telemetry.span("tool.parse", tool=source["tool_name"]):
+                    description = source_tool_description(source["file_content"], source["tool_name"])
+                    details = await asyncio.to_thread(tool_details, source["tool_name"], description, source["file_content"])
+            except Exception as error:
+                return {"source_path": path, "status": "failed", "error": f"{type(error).__name__}: {error}"}
+
+            return {
+                "source_path": path,
+                "tool_name": source["tool_name"],
+                "status": "updated" if path in existing_tools else "created",
+                "source_hash": source["source_hash"],
+                "details": details,
+                "typed_params": [],
+                "llm_typed": bool(unresolved_parameters(details)),
+                "started": started
+            }
+
+    async def type_batch(batch):
+        details_list = [result["details"] for result in batch]
+        async with slots:
+            try:
+                await rate_limiter.aacquire()
+                with telemetry.span("tool.type", tools=len(batch)):
+                    llm_respone = await typing_llm.ainvoke(parameter_typing_prompt(details_list))
+            except Exception as error:
+                for result in batch:
+                    result.update(status="failed", error=f"{type(error).__name__}: {error}")
+                return
+        for result, typed_params in zip(batch, batch_typed_parameters(details_list, llm_respone)):
+            result["typed_params"] = typed_params
+
+    async def finish(result):
+        if result["status"] not in ("created", "updated"):
+            return result
+        try:
+            tool_name, tool_description, final_code = render_tool(result["details"], tool_parameters(result["details"], result["typed_params"]))
+            tool_path = await asyncio.to_thread(write_tool, tool_name, final_code, source_path_suffix(result["source_path"]))
+        except Exception as error:
+            return {"source_path": result["source_path"], "status": "failed", "error": f"{type(error).__name__}: {error}"}
+
+        return {
+            "source_path": result["source_path"],
+            "tool_name": tool_name,
+            "status": result["status"],
+            "llm_typed": result["llm_typed"],
+            "elapsed_ms": (time.perf_counter() - result["started"]) * 1000,
+            "document": {
+                "name": tool_name,
+                "description": tool_description,
+                "tool_path": tool_path,
+                **settings,
+                "source_path": result["source_path"],
+                "source_hash": result["source_hash"],
+                "built_at": time.time()
+            }
+        }
+
+    prepared = await asyncio.gather(*(prepare(path) for path in paths))
+    pending = [result for result in prepared if result.get("llm_typed")]
+    batch_size = max(batch_size or TOOL_BUILD_BATCH_SIZE, 1)
+    await asyncio.gather(*(type_batch(pending[index:index + batch_size]) for index in range(0, len(pending), batch_size)))
+    results = await asyncio.gather(*(finish(result) for result in prepared))
+
+    operations = [
+        UpdateOne({"source_path": result["source_path"]}, {"$set": result["document"]}, upsert=True)
+        for result in results if "document" in result
+    ]
+    if operations:
+        await asyncio.to_thread(tools_collection.bulk_write, operations, ordered=False)
+        invalidate("tools")
+        if any(result["status"] in ("updated", "reconfigured") for result in results):
+            invalidate_compiled_agent()
+    return results
+
+def build_tools(directory, recursive=False, execution=None, concurrency=None, rate=None, force=False, batch_size=None, memoize=None, memoize_ttl=None):
+    if not os.path.isdir(directory):
+        print(f"\n❌ {directory!r} is not a directory. ❌", file=sys.stderr)
+        return 1
+
+    paths = scan_sources(directory, recursive)
+    started = time.perf_counter()
+    memoize = {"mode": memoize, "ttl": memoize_ttl} if memoize else None
+    results = asyncio.run(abuild_tools(paths, {"mode": execution} if execution else None, concurrency, rate, force, batch_size, memoize))
+
+    counts = {"created": 0, "updated": 0, "reconfigured": 0, "skipped": 0, "failed": 0}
+    llm_typed = 0
+    for result in results:
+        counts[result["status"]] += 1
+        llm_typed += result.get("llm_typed", False)
+        if result["status"] == "failed":
+            print(f"❌ {result['source_path']}: {result['error']}", file=sys.stderr)
+        elif result["status"] == "skipped":
+            print(f"⏭️  {result['tool_name']} is unchanged ({result['source_path']})")
+        elif result["status"] == "reconfigured":
+            print(f"⚙️  {result['tool_name']} is unchanged, execution and memoization settings updated ({result['source_path']})")
+        else:
+            print(f"✅ {result['tool_name']} {result['status']} in {result['elapsed_ms']:.0f}ms ({result['source_path']})")
+
+    print(
+        f"\n✅ Built {counts['created'] + counts['updated']} tool(s) from {len(paths)} file(s) in {time.perf_counter() - started:.1f}s "
+        f"({counts['created']} created, {counts['updated']} updated, {counts['reconfigured']} reconfigured, {counts['skipped']} unchanged, {counts['failed']} failed, "
+        f"{llm_typed} typed by the LLM) ✅"
+    )
+    return 1 if counts["failed"] else 0
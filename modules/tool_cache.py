@@ -0,0 +1,152 @@
+from collections import OrderedDict
+from dotenv import load_dotenv
+from modules import telemetry
+import threading
+import hashlib
+import sqlite3
+import json
+import time
+import os
+
+load_dotenv()
+
+MEMOIZE_MODES = ["off", "pure", "ttl"]
+
+TOOL_CACHE_SIZE = int(os.getenv("TOOL_CACHE_SIZE", "1024"))
+TOOL_CACHE_TTL = float(os.getenv("TOOL_CACHE_TTL", "300"))
+TOOL_CACHE_SHARED = os.getenv("TOOL_CACHE_SHARED", "false").lower() in ("1", "true", "yes")
+TOOL_CACHE_PATH = os.getenv("TOOL_CACHE_PATH", ".tool_cache.sqlite")
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "100000"))
+
+_results = OrderedDict()
+_results_lock = threading.Lock()
+_shared_store = None
+_shared_store_built = False
+tool_cache_stats = {"hits": 0, "shared_hits": 0, "misses": 0, "evictions": 0}
+
+def normalize_memoize_policy(policy):
+    policy = dict(policy or {})
+    policy["mode"] = (policy.get("mode") or "off").lower()
+    if policy["mode"] not in MEMOIZE_MODES:
+        raise ValueError(f"Unknown tool memoization mode: {policy['mode']}")
+    policy["ttl"] = float(policy.get("ttl") or TOOL_CACHE_TTL) if policy["mode"] == "ttl" else None
+    if policy["ttl"] is not None and policy["ttl"] <= 0:
+        raise ValueError("Tool cache TTL must be positive")
+    return policy
+
+class SQLiteToolCacheStore:
+    def __init__(self, path, max_entries):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS tool_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS tool_cache_accessed_at ON tool_cache (accessed_at)")
+        self.connection.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value, expires_at FROM tool_cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, now)
+            ).fetchone()
+            if row is not None:
+                self.connection.execute("UPDATE tool_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                self.connection.commit()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def put(self, key, value, expires_at):
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO tool_cache VALUES (?, ?, ?, ?)", (key, value, expires_at, time.time()))
+            self.connection.execute(
+                "DELETE FROM tool_cache WHERE key IN (SELECT key FROM tool_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self.connection.commit()
+
+    def clear(self):
+        with self.lock:
+            self.connection.execute("DELETE FROM tool_cache")
+            self.connection.commit()
+
+def _get_shared_store():
+    global _shared_store, _shared_store_built
+    if not _shared_store_built:
+        with _results_lock:
+            if not _shared_store_built:
+                _shared_store = SQLiteToolCacheStore(TOOL_CACHE_PATH, TOOL_CACHE_MAX_ENTRIES) if TOOL_CACHE_SHARED else None
+                _shared_store_built = True
+    return _shared_store
+
+def cache_key(tool_path, version, policy, arguments):
+    payload = json.dumps([tool_path, version, policy["mode"], policy["ttl"], arguments], sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _cache_put(key, value, expires_at):
+    with _results_lock:
+        _results[key] = (value, expires_at)
+        _results.move_to_end(key)
+        while len(_results) > TOOL_CACHE_SIZE:
+            _results.popitem(last=False)
+            tool_cache_stats["evictions"] += 1
+
+def memoized_call(tool_path, version, policy, arguments, compute):
+    key = cache_key(tool_path, version, policy, arguments)
+    now = time.time()
+
+    with _results_lock:
+        entry = _results.get(key)
+        if entry is not None and (entry[1] is None or entry[1] > now):
+            _results.move_to_end(key)
+            tool_cache_stats["hits"] += 1
+            telemetry.increment("tool_cache_hits")
+            return entry[0]
+        if entry is not None:
+            del _results[key]
+
+    store = _get_shared_store()
+    shared_entry = store.get(key) if store is not None else None
+    if shared_entry is not None:
+        _cache_put(key, *shared_entry)
+        tool_cache_stats["shared_hits"] += 1
+        telemetry.increment("tool_cache_hits")
+        return shared_entry[0]
+
+    tool_cache_stats["misses"] += 1
+    telemetry.increment("tool_cache_misses")
+    value = compute()
+    expires_at = time.time() + policy["ttl"] if policy["mode"] == "ttl" else None
+    _cache_put(key, value, expires_at)
+    if store is not None:
+        try:
+            serialized = json.dumps(value)
+        except (TypeError, ValueError):
+            serialized = None
+        if serialized is not None:
+            store.put(key, serialized, expires_at)
+    return value
+
+def clear_tool_cache():
+    with _results_lock:
+        _results.clear()
+    store = _get_shared_store()
+    if store is not None:
+        store.clear()
+
+def get_tool_cache_stats():
+    with _results_lock:
+        lookups = tool_cache_stats["hits"] + tool_cache_stats["shared_hits"] + tool_cache_stats["misses"]
+        return {
+            **tool_cache_stats,
+            "size": len(_results),
+            "max_size": TOOL_CACHE_SIZE,
+            "shared": TOOL_CACHE_SHARED,
+            "hit_rate": (tool_cache_stats["hits"] + tool_cache_stats["shared_hits"]) / lookups if lookups else 0.0
+        }
@@ -0,0 +1,181 @@
+import builtins
+import ast
+import re
+
+CONVERSION_TYPES = {"int", "float", "str", "bool", "list", "dict", "tuple", "set"}
+USAGE_TYPES = {"int", "float"}
+TYPE_SOURCES = ["annotation", "docstring", "conversion", "default", "usage", "literal", "input"]
+DOCSTRING_SECTIONS = {"args:", "arguments:", "parameters:", "params:"}
+TEMPLATE_NAMES = {"Type", "Optional"}
+
+def docstring_arguments(docstring):
+    arguments = {}
+    in_section = False
+    indent = current = None
+    for line in (docstring or "").splitlines():
+        stripped = line.strip()
+        if stripped.lower() in DOCSTRING_SECTIONS:
+            in_section, indent, current = True, None, None
+            continue
+        if not in_section:
+            continue
+        if not stripped or re.match(r'^[A-Z]\w*:$', stripped):
+            in_section = False
+            continue
+
+        line_indent = len(line) - len(line.lstrip())
+        match = re.match(r'^\*{0,2}(\w+)\s*(?:\(([^)]*)\))?\s*:\s*(.*)$', stripped)
+        if match and (indent is None or line_indent <= indent):
+            indent, current = line_indent, match.group(1)
+            arguments[current] = {"type": _valid_type(match.group(2)), "description": match.group(3).strip()}
+        elif current is not None:
+            arguments[current]["description"] = f"{arguments[current]['description']} {stripped}".strip()
+    return arguments
+
+def _valid_type(type_text):
+    type_text = (type_text or "").split(",")[0].strip()
+    if not type_text:
+        return None
+    try:
+        ast.parse(type_text, mode="eval")
+    except SyntaxError:
+        return None
+    return type_text
+
+def imported_names(imports):
+    names = set()
+    for node in imports:
+        for alias in node.names:
+            if alias.name != "*":
+                names.add(alias.asname or alias.name.split(".")[0])
+    return names
+
+def resolvable_type(type_text, known_names):
+    try:
+        annotation = ast.parse(type_text, mode="eval").body
+    except SyntaxError:
+        return False
+    for node in ast.walk(annotation):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            return False
+        if isinstance(node, ast.Name) and node.id not in known_names and not hasattr(builtins, node.id):
+            return False
+    return True
+
+def is_main_block(node):
+    return (
+        isinstance(node, ast.If) and isinstance(node.test, ast.Compare)
+        and isinstance(node.test.left, ast.Name) and node.test.left.id == '__name__'
+    )
+
+def _called_name(node):
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+        return node.func.id
+    return None
+
+def _literal_type(node):
+    try:
+        value = ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return None
+    return None if value is None else type(value).__name__
+
+def _input_prompt(node):
+    if node.args and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str):
+        return node.args[0].value.strip().rstrip(":").strip() or None
+    return None
+
+def _assignment_evidence(value, evidence):
+    called_name = _called_name(value)
+    if called_name in CONVERSION_TYPES and len(value.args) == 1:
+        evidence["conversion"].append(called_name)
+        if _called_name(value.args[0]) == "input":
+            evidence["prompt"].append(_input_prompt(value.args[0]))
+    elif called_name == "input":
+        evidence["input"].append("str")
+        evidence["prompt"].append(_input_prompt(value))
+    elif called_name is None:
+        evidence["literal"].append(_literal_type(value))
+
+def _parameter_evidence(function, parameter, evidence):
+    arguments = function.args
+    positional = arguments.posonlyargs + arguments.args
+    defaults = dict(zip([argument.arg for argument in positional[len(positional) - len(arguments.defaults):]], arguments.defaults))
+    defaults.update({
+        argument.arg: default for argument, default in zip(arguments.kwonlyargs, arguments.kw_defaults) if default is not None
+    })
+
+    for argument in positional + arguments.kwonlyargs:
+        if argument.arg == parameter and argument.annotation is not None:
+            evidence["annotation"].append(ast.unparse(argument.annotation))
+    if parameter in defaults:
+        evidence["default"].append(_literal_type(defaults[parameter]))
+
+    documented = docstring_arguments(ast.get_docstring(function)).get(parameter)
+    if documented is not None:
+        evidence["docstring"].append(documented["type"])
+        evidence["description"].append(documented["description"])
+
+def _bound_parameters(function, call, name):
+    positional = [argument.arg for argument in function.args.posonlyargs + function.args.args]
+    keywords = set(positional + [argument.arg for argument in function.args.kwonlyargs])
+    bound = [
+        positional[index] for index, argument in enumerate(call.args)
+        if index < len(positional) and isinstance(argument, ast.Name) and argument.id == name
+    ]
+    bound.extend(
+        keyword.arg for keyword in call.keywords
+        if keyword.arg in keywords and isinstance(keyword.value, ast.Name) and keyword.value.id == name
+    )
+    return bound
+
+def _body_summary(body):
+    summary = {"assignments": {}, "usages": {}, "calls": []}
+    for node in (node for statement in body for node in ast.walk(statement)):
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    summary["assignments"].setdefault(target.id, []).append(node.value)
+            continue
+
+        called_name = _called_name(node)
+        if called_name in USAGE_TYPES and len(node.args) == 1 and isinstance(node.args[0], ast.Name):
+            summary["usages"].setdefault(node.args[0].id, []).append(called_name)
+        elif called_name is not None:
+            summary["calls"].append(node)
+    return summary
+
+def _collect_evidence(name, summary, functions, summaries, evidence, visited):
+    for value in summary["assignments"].get(name, []):
+        _assignment_evidence(value, evidence)
+    evidence["usage"].extend(summary["usages"].get(name, []))
+
+    for call in summary["calls"]:
+        function = functions.get(call.func.id)
+        if function is None:
+            continue
+        for parameter in _bound_parameters(function, call, name):
+            if (function.name, parameter) not in visited:
+                visited.add((function.name, parameter))
+                _parameter_evidence(function, parameter, evidence)
+                if function.name not in summaries:
+                    summaries[function.name] = _body_summary(function.body)
+                _collect_evidence(parameter, summaries[function.name], functions, summaries, evidence, visited)
+
+def infer_parameters(tree, parameter_names):
+    functions = {node.name: node for node in tree.body if isinstance(node, ast.FunctionDef)}
+    main_summary = _body_summary([statement for node in tree.body if is_main_block(node) for statement in node.body])
+    summaries = {}
+    known_names = TEMPLATE_NAMES | imported_names(node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+    inferred = {}
+    for name in parameter_names:
+        evidence = {source: [] for source in TYPE_SOURCES + ["description", "prompt"]}
+        _collect_evidence(name, main_summary, functions, summaries, evidence, set())
+
+        parameter_type = next((found for source in TYPE_SOURCES for found in evidence[source] if found and resolvable_type(found, known_names)), None)
+        if parameter_type is None:
+            continue
+        description = next((found for found in evidence["description"] + evidence["prompt"] if found), None)
+        inferred[name] = {"name": name, "type": parameter_type, "description": description or name.replace("_", " ").capitalize()}
+    return inferred
@@ -1,13 +1,18 @@
 from typing_extensions import TypedDict, List
-from modules.db_config import db
+from modules.repository import get_documents, iter_documents, invalidate
+from modules.tool_inference import TEMPLATE_NAMES, infer_parameters, is_main_block, imported_names, resolvable_type
+from modules.tool_sandbox import EXECUTION_MODES, normalize_execution_profile, wrap_tool
+from modules.tool_cache import MEMOIZE_MODES, normalize_memoize_policy
+from modules.db_config import get_db
+from modules import telemetry
 from dotenv import load_dotenv
 from typing import Annotated
-from modules.llm_config import llm
-from bson import ObjectId
-import importlib
-import textwrap
+from modules.llm_config import get_llm, model_for
+import importlib.util
+import py_compile
+import threading
+import hashlib
 import inspect
-import astor
 import json
 import ast
 import os
@@ -15,91 +20,113 @@ import re
 
 load_dotenv()
 
-def parse_code(file_content):
-    class FunctionCollector(ast.NodeTransformer):
-        def __init__(self):
-            self.func_defs = []
-            self.top_level_calls = []
+_tool_registry = {}
+_tool_registry_lock = threading.Lock()
 
-        def visit_FunctionDef(self, node):
-            self.func_defs.append(node)
-            return None
+class FuncParams(TypedDict):
+    name: Annotated[str, ..., "Function Parameter Name"]
+    type: Annotated[str, ..., "Function Parameter Type"]
+    description: Annotated[str, ..., "Function Parameter Description"]
 
-        def visit_If(self, node):
-            if (isinstance(node.test, ast.Compare)
-                and isinstance(node.test.left, ast.Name) and node.test.left.id == '__name__'):
-                self.top_level_calls.extend(node.body)
-            return None
+class ToolParameters(TypedDict):
+    tool_id: Annotated[int, ..., "ID of the Tool the Parameters belong to"]
+    func_params: Annotated[List[FuncParams], ..., "List of Function Parameters"]
 
-    tree = ast.parse(file_content)
-    collector = FunctionCollector()
-    collector.visit(tree)
-    
-    imports = []
-    for node in ast.walk(tree):
-        if isinstance(node, ast.Import):
-            for alias in node.names:
-                imports.append(f"import {alias.name}")
-        elif isinstance(node, ast.ImportFrom):
-            for alias in node.names:
-                imports.append(f"from {node.module} import {alias.name}")
-
-    input_args = set()
-    for stmt in collector.top_level_calls:
-        for node in ast.walk(stmt):
-            if isinstance(node, ast.Call):
-                for arg in node.args:
-                    if isinstance(arg, ast.Name): 
-                        input_args.add(arg.id)
-            elif isinstance(node, ast.Assign):
-                for target in node.targets:
-                    if isinstance(target, ast.Name):
-                        input_args.add(target.id)
-
-    input_args = list(input_args)
-    if collector.top_level_calls:
-        last_stmt = collector.top_level_calls[-1]
-        if isinstance(last_stmt, ast.Expr):
-            collector.top_level_calls[-1] = ast.Return(value=last_stmt.value)
-        elif isinstance(last_stmt, ast.Assign):
-            target = last_stmt.targets[0]
-            if isinstance(target, ast.Name):
-                collector.top_level_calls.append(ast.Return(value=ast.Name(id=target.id, ctx=ast.Load())))
-    
-    main_func = ast.FunctionDef(
-        name="some_function",
-        args=ast.arguments(
-            args=[ast.arg(arg=name) for name in input_args],
-            vararg=None, kwarg=None, defaults=[],
-            posonlyargs=[], kwonlyargs=[], kw_defaults=[]
-        ),
-        body=collector.func_defs + collector.top_level_calls,
-        decorator_list=[]
-    )
+class ToolBatchParameters(TypedDict):
+    tools: Annotated[List[ToolParameters], ..., "Function Parameters of every given Tool"]
 
-    new_module = ast.Module(body=[main_func], type_ignores=[])
-
-    unified_function = astor.to_source(new_module)
-
-    tree = ast.parse(unified_function)
-    params = []
+TOOL_TEMPLATE = '''
+from langchain_core.tools import BaseTool
+from typing import Type, Optional
 
-    for node in tree.body:
-        if isinstance(node, ast.FunctionDef):
-            func_name = node.name
-            args = [arg.arg for arg in node.args.args]
-            if node.args.vararg:
-                args.append(node.args.vararg.arg)
-            if node.args.kwarg:
-                args.append(node.args.kwarg.arg)
-            params.append(args)
+class ToolClass(BaseTool):
+    name: str = ""
+    description: str = ""
 
-    function_parameters = params[0]
+    def _run(self):
+        pass
+'''
 
-    return imports, function_parameters, unified_function
+class ToolSourceTransformer(ast.NodeTransformer):
+    def __init__(self, source_lines):
+        self.source_lines = source_lines
+        self.imports = []
+        self.definitions = []
+        self.main_body = []
+        self.input_args = {}
+        self.in_main = False
+        self.calls_input = False
+
+    def visit(self, node):
+        if not isinstance(node, ast.stmt):
+            return super().visit(node)
+        calls_input, self.calls_input = self.calls_input, False
+        node = super().visit(node)
+        if self.calls_input and hasattr(node, "body"):
+            raise ValueError(
+                f"input() in the header of the {type(node).__name__} statement on line {node.lineno} cannot become a tool parameter; "
+                "assign it to a variable first"
+            )
+        drop = self.calls_input
+        self.calls_input = calls_input
+        return None if drop else node
+
+    def generic_visit(self, node):
+        node = super().generic_visit(node)
+        if isinstance(getattr(node, "body", None), list) and not node.body:
+            node.body = [ast.Pass()]
+        return node
+
+    def needs_rewrite(self, node):
+        segment = "".join(self.source_lines[node.lineno - 1:node.end_lineno])
+        return "input" in segment or "import" in segment
+
+    def visit_Module(self, node):
+        for statement in node.body:
+            if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                self.definitions.append(self.visit(statement) if self.needs_rewrite(statement) else statement)
+            elif is_main_block(statement):
+                self.in_main = True
+                self.main_body.extend(filter(None, map(self.visit, statement.body)))
+                self.in_main = False
+            else:
+                self.visit(statement)
+
+        if self.main_body:
+            last_stmt = self.main_body[-1]
+            if isinstance(last_stmt, ast.Expr):
+                self.main_body[-1] = ast.Return(value=last_stmt.value)
+            elif isinstance(last_stmt, ast.Assign) and isinstance(last_stmt.targets[0], ast.Name):
+                self.main_body.append(ast.Return(value=ast.Name(id=last_stmt.targets[0].id, ctx=ast.Load())))
+        return node
+
+    def visit_Import(self, node):
+        self.imports.append(node)
+        return node
+
+    def visit_ImportFrom(self, node):
+        self.imports.append(node)
+        return node
+
+    def visit_Assign(self, node):
+        if self.in_main:
+            self.input_args.update((target.id, None) for target in node.targets if isinstance(target, ast.Name))
+        return self.generic_visit(node)
+
+    def visit_Call(self, node):
+        if isinstance(node.func, ast.Name) and node.func.id == "input":
+            self.calls_input = True
+        if self.in_main:
+            self.input_args.update((argument.id, None) for argument in node.args if isinstance(argument, ast.Name))
+        return self.generic_visit(node)
+
+def parse_code(tree, file_content):
+    transformer = ToolSourceTransformer(file_content.splitlines(keepends=True))
+    transformer.visit(tree)
+    return transformer.imports, list(transformer.input_args), transformer.definitions + transformer.main_body
 
 def tool_creation():
-    tools_collection = db['tools']
+    tools_collection = get_db()['tools']
     print("""\n
 Sample Code Structure to Successfully Build a Tool
 -------------------------------------------------------------------------------
@@ -137,35 +164,85 @@ Sample Code Structure to Successfully Build a Tool
     with open(normalized_path, 'r', encoding='utf-8') as file:
         file_content = file.read()
 
-    imports, function_parameters, unified_function = parse_code(file_content)
+    details = tool_details(tool_name, tool_description, file_content)
+    typed_params = []
+    if unresolved_parameters(details):
+        llm_respone = get_llm(model_for("tools")).with_structured_output(ToolBatchParameters).invoke(parameter_typing_prompt([details]))
+        typed_params = batch_typed_parameters([details], llm_respone)[0]
+    tool_name, tool_description, final_code = render_tool(details, tool_parameters(details, typed_params))
+    tool_path = write_tool(tool_name, final_code)
+    
+    tool_data = {
+        "name": tool_name,
+        "description": tool_description,
+        "tool_path": tool_path,
+        "execution": select_execution_profile(),
+        "memoize": select_memoize_policy()
+    }
+    result = tools_collection.insert_one(tool_data)
+    invalidate("tools", result.inserted_id)
+    print("\nTool created successfully!\n")
+
+def tool_details(tool_name, tool_description, file_content):
+    tree = ast.parse(file_content)
+    imports, function_parameters, body = parse_code(tree, file_content)
 
-    details = {
+    return {
         "imports": imports,
         "tool_name": tool_name,
         "tool_description": tool_description,
-        "code": unified_function,
+        "code": file_content,
+        "body": body,
         "function_parameters": function_parameters,
+        "inferred_parameters": infer_parameters(tree, function_parameters)
     }
 
-    class FuncParams(TypedDict):
-        name: Annotated[str, ..., "Function Parameter Name"]
-        type: Annotated[str, ..., "Function Parameter Type"]
-        description: Annotated[str, ..., "Function Parameter Description"]
-    
-    class Router(TypedDict):
-        func_params: Annotated[List[FuncParams], ..., "List of Function Parameters"]
-    
-    system_prompt = """
-        Given tool code and other relevant details, your task is to simply assign a valid PYTHON data type and description to the GIVEN function parameters only.
-        The code and other given detaiils are for your context only.
+def unresolved_parameters(details):
+    return [name for name in details["function_parameters"] if name not in details["inferred_parameters"]]
+
+def parameter_typing_prompt(details_list):
+    tools = [
+        {
+            "tool_id": tool_id,
+            "imports": [ast.unparse(node) for node in details["imports"]],
+            "tool_name": details["tool_name"],
+            "tool_description": details["tool_description"],
+            "code": details["code"],
+            "function_parameters": unresolved_parameters(details)
+        }
+        for tool_id, details in enumerate(details_list)
+    ]
+    return """
+        Given the code and other relevant details of one or more tools, your task is to simply assign a valid PYTHON data type and description to the GIVEN function parameters of each tool only.
+        Return the parameters of every tool under its tool_id. The code and other given detaiils are for your context only.
         
-        Tool Details:
-    """ + json.dumps(details)
-
-    llm_respone = llm.with_structured_output(Router).invoke(system_prompt)
-    func_params = llm_respone["func_params"]
-
-    tool_name = re.sub(r'[^\w\s]', '', tool_name)
+        Tools:
+    """ + json.dumps(tools)
+
+def batch_typed_parameters(details_list, llm_respone):
+    typed_params = {tool["tool_id"]: tool["func_params"] for tool in llm_respone["tools"]}
+    return [typed_params.get(tool_id, []) for tool_id in range(len(details_list))]
+
+def tool_parameters(details, typed_params=None):
+    known_names = TEMPLATE_NAMES | imported_names(details["imports"])
+    typed_params = {
+        item["name"]: item if resolvable_type(item["type"], known_names) else {**item, "type": "str"}
+        for item in typed_params or []
+    }
+    return [
+        details["inferred_parameters"].get(name) or typed_params.get(name)
+        or {"name": name, "type": "str", "description": name.replace("_", " ").capitalize()}
+        for name in details["function_parameters"]
+    ]
+
+def type_annotation(type_text):
+    try:
+        return ast.parse(type_text, mode="eval").body
+    except SyntaxError:
+        return None
+
+def render_tool(details, func_params):
+    tool_name = re.sub(r'[^\w\s]', '', details["tool_name"])
     tool_name = re.sub(r'\s+', ' ', tool_name)
 
     function_name = tool_name.replace(" ", "_")
@@ -176,96 +253,146 @@ Sample Code Structure to Successfully Build a Tool
     additional_desc = "\nArgs:\n"
     for key, val in function_params.items():
         additional_desc += f"\t{key}: {val}\n"
-    tool_description += additional_desc
-
-    import_lines = "\n".join(imports)
-    func_params_code = "self"
-    if len(func_params) > 0:
-        func_params_code += ", " + ", ".join([f"{item['name']}: {item['type']}" for item in func_params])
-    
-    function_code = re.sub(r'some_function\s*\([^()]*\)', f"_run({func_params_code})", unified_function)
-    function_code = re.sub(r'^\s*.*input\(.*\).*$', '', function_code, flags=re.MULTILINE)
-    function_code = textwrap.indent(function_code, '\t')
+    tool_description = details["tool_description"] + additional_desc
 
-    template = '''
-from langchain_core.tools import BaseTool
-from typing import Type, Optional
-{import_lines}
-class {class_name}(BaseTool):
-\tname: str = "{function_name}"
-\tdescription: str = \"\"\"{tool_description}\"\"\"
+    module = ast.parse(TOOL_TEMPLATE)
+    tool_class = module.body[-1]
+    tool_class.name = class_name
+    tool_class.body[0].value.value = function_name
+    tool_class.body[1].value.value = tool_description
 
-{function_code}
-'''
+    run_function = tool_class.body[2]
+    run_function.args.args.extend(ast.arg(arg=item["name"], annotation=type_annotation(item["type"])) for item in func_params)
+    run_function.body = details["body"] or run_function.body
 
-    final_code = template.format(
-        import_lines=import_lines,
-        class_name=class_name,
-        function_name=function_name,
-        tool_description=tool_description,
-        function_code=function_code
-    )
-    
+    module.body[-1:-1] = details["imports"]
+    final_code = ast.unparse(ast.fix_missing_locations(module))
+    return tool_name, tool_description, final_code
 
+def write_tool(tool_name, final_code, suffix=None):
     tool_dir = os.getenv("TOOLS_DIRECTORY")
-    tool_path = os.path.join(tool_dir, f"{tool_name.title().replace(" ", "_")}.py")
+    file_name = tool_name.title().replace(" ", "_") + (f"_{suffix}" if suffix else "")
+    tool_path = os.path.join(tool_dir, f"{file_name}.py")
 
     os.makedirs(tool_dir, exist_ok=True)
     
     with open(f"{tool_path}", "w", encoding='utf-8') as file:
         file.write(final_code)
-    
-    tool_data = {
-        "name": tool_name,
-        "description": tool_description,
-        "tool_path": tool_path
+    compile_tool_module(tool_path)
+    return tool_path
+
+def select_execution_profile():
+    while True:
+        mode = input(f"\nEnter tool execution mode ({'/'.join(EXECUTION_MODES)}) or press Enter for default: ").strip().lower()
+        timeout = memory_mb = max_concurrency = None
+        if mode in ("thread", "process"):
+            timeout = input("Enter the timeout in seconds or press Enter for default: ").strip()
+            max_concurrency = input("Enter the maximum concurrent calls or press Enter for no limit: ").strip()
+        if mode == "process":
+            memory_mb = input("Enter the worker memory limit in MB or press Enter for default: ").strip()
+
+        try:
+            return normalize_execution_profile({"mode": mode, "timeout": timeout, "memory_mb": memory_mb, "max_concurrency": max_concurrency})
+        except ValueError:
+            print("\n❌ Invalid execution profile. Please try again. ❌")
+
+def select_memoize_policy():
+    while True:
+        mode = input(f"\nCache results of this tool ({'/'.join(MEMOIZE_MODES)}; pure only if the same arguments always give the same result) or press Enter for off: ").strip().lower()
+        ttl = None
+        if mode == "ttl":
+            ttl = input("Enter how long results stay cached in seconds or press Enter for default: ").strip()
+
+        try:
+            return normalize_memoize_policy({"mode": mode, "ttl": ttl})
+        except ValueError:
+            print("\n❌ Invalid cache policy. Please try again. ❌")
+
+def format_tool(tool):
+    return {
+        "tool_id": str(tool.get("_id")),
+        "tool_name": tool.get("name"),
+        "tool_description": tool.get("description"),
+        "tool_path": tool.get("tool_path"),
+        "execution": tool.get("execution"),
+        "memoize": tool.get("memoize")
     }
-    tools_collection.insert_one(tool_data)
-    print("\nTool created successfully!\n")
+
+def iter_tools(page_size=None):
+    for i, tool in enumerate(iter_documents("tools", page_size=page_size), start=1):
+        yield {"reference_id": i, **format_tool(tool)}
 
 def fetch_tools():
-    tools_collection = db['tools']
-    tools = tools_collection.find()
-
-    available_tools = []
-    for i, tool in enumerate(tools, start=1):
-        available_tools.append({
-            "reference_id": i,
-            "tool_id": str(tool.get("_id")),
-            "tool_name": tool.get("name"),
-            "tool_description": tool.get("description"),
-            "tool_path": tool.get("tool_path")
-        })
-    
-    return available_tools
+    return list(iter_tools())
 
 def display_tools(tools):
-    if tools is None or len(tools) == 0:
-        tools = fetch_tools()
+    if not tools:
+        tools = iter_tools()
     
     print("\nAvailable Tools:\n")
     for tool in tools:
         print(f"  - Reference ID: {tool['reference_id']}, Tool ID: {tool['tool_id']}, Name: {tool['tool_name']}, Description: {tool['tool_description']}")
 
-def fetch_tool_objects(tool_ids):
-    tools_collection = db['tools']
-    
-    object_ids = [ObjectId(id) for id in tool_ids]
-    cursor = tools_collection.find(
-        {"_id": {"$in": object_ids}},
-        {"_id": 0, "tool_path": 1}
+def compile_tool_module(path):
+    py_compile.compile(
+        path,
+        doraise=True,
+        invalidation_mode=py_compile.PycInvalidationMode.CHECKED_HASH
     )
-    
-    file_path_list = [doc["tool_path"] for doc in cursor]
-    tool_list = []
-    for path in file_path_list:
+
+def load_tool_class(path):
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+
+    with _tool_registry_lock:
+        entry = _tool_registry.get(path)
+        if entry is not None and (entry["mtime_ns"], entry["size"]) == (stat.st_mtime_ns, stat.st_size):
+            return entry["tool_class"]
+
+    with open(path, 'rb') as file:
+        content_hash = hashlib.sha256(file.read()).hexdigest()
+
+    if entry is not None and entry["content_hash"] == content_hash:
+        tool_class = entry["tool_class"]
+    else:
+        if not os.path.exists(importlib.util.cache_from_source(path)):
+            compile_tool_module(path)
+
+        from langchain_core.tools import BaseTool
+
         module_name = os.path.splitext(os.path.basename(path))[0]
         spec = importlib.util.spec_from_file_location(module_name, path)
         module = importlib.util.module_from_spec(spec)
         spec.loader.exec_module(module)
-    
-        for name, obj in inspect.getmembers(module):
-            if name != 'BaseTool' and inspect.isclass(obj):
-                tool_list.append(obj())
+
+        tool_class = None
+        for name, obj in inspect.getmembers(module, inspect.isclass):
+            if issubclass(obj, BaseTool) and obj is not BaseTool and obj.__module__ == module.__name__:
+                tool_class = obj
                 break
+        if tool_class is None:
+            raise ImportError(f"No BaseTool subclass found in {path}")
+
+    with _tool_registry_lock:
+        _tool_registry[path] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "content_hash": content_hash,
+            "tool_class": tool_class
+        }
+
+    return tool_class
+
+def tool_version(path):
+    with _tool_registry_lock:
+        entry = _tool_registry.get(os.path.abspath(path))
+    return entry["content_hash"] if entry else ""
+
+def fetch_tool_objects(tool_ids):
+    tool_documents = get_documents("tools", tool_ids, {"tool_path": 1, "execution": 1, "memoize": 1})
+    tool_list = []
+    with telemetry.span("tools.load", tools=len(tool_documents)):
+        for doc in tool_documents:
+            tool = load_tool_class(doc["tool_path"])()
+            tool_list.append(wrap_tool(tool, doc["tool_path"], doc.get("execution"), doc.get("memoize"), tool_version(doc["tool_path"])))
     return tool_list
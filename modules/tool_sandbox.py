@@ -0,0 +1,251 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from dotenv import load_dotenv
+from modules.tool_cache import normalize_memoize_policy, memoized_call
+from modules import telemetry
+import multiprocessing
+import threading
+import atexit
+import pickle
+import signal
+import time
+import os
+
+load_dotenv()
+
+EXECUTION_MODES = ["inline", "thread", "process"]
+
+TOOL_EXECUTION = os.getenv("TOOL_EXECUTION", "inline").lower()
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "60"))
+TOOL_MEMORY_MB = int(os.getenv("TOOL_MEMORY_MB", "0"))
+TOOL_THREAD_WORKERS = int(os.getenv("TOOL_THREAD_WORKERS", "16"))
+TOOL_PROCESS_WORKERS = int(os.getenv("TOOL_PROCESS_WORKERS", str(os.cpu_count() or 2)))
+
+_thread_pool = None
+_process_pools = {}
+_tool_slots = {}
+_pools_lock = threading.Lock()
+
+def normalize_execution_profile(profile):
+    profile = dict(profile or {})
+    profile["mode"] = (profile.get("mode") or TOOL_EXECUTION).lower()
+    if profile["mode"] not in EXECUTION_MODES:
+        raise ValueError(f"Unknown tool execution mode: {profile['mode']}")
+    profile["timeout"] = float(profile.get("timeout") or TOOL_TIMEOUT)
+    profile["memory_mb"] = int(profile.get("memory_mb") or TOOL_MEMORY_MB)
+    profile["max_concurrency"] = int(profile.get("max_concurrency") or 0)
+    return profile
+
+def _limit_memory(memory_mb):
+    try:
+        import resource
+    except ImportError:
+        return
+    limit = memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+def _worker_main(connection, memory_mb, preload_paths):
+    from modules.tool_operations import load_tool_class
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if memory_mb:
+        _limit_memory(memory_mb)
+    for path in preload_paths:
+        try:
+            load_tool_class(path)
+        except Exception:
+            pass
+    connection.send(("ready", None))
+
+    while True:
+        try:
+            path, arguments = connection.recv()
+        except (EOFError, OSError):
+            break
+        try:
+            response = ("ok", load_tool_class(path)()._run(**arguments))
+        except BaseException as error:
+            response = ("error", f"{type(error).__name__}: {error}")
+        try:
+            connection.send(response)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            connection.send(("ok", str(response[1])))
+
+class ToolWorkerPool:
+    def __init__(self, max_workers, memory_mb):
+        self.max_workers = max(max_workers, 1)
+        self.memory_mb = memory_mb
+        self.context = multiprocessing.get_context("spawn")
+        self.condition = threading.Condition()
+        self.idle = []
+        self.workers = 0
+        self.preload_paths = set()
+
+    def _spawn(self, preload_paths):
+        parent_connection, child_connection = self.context.Pipe()
+        process = self.context.Process(
+            target=_worker_main,
+            args=(child_connection, self.memory_mb, preload_paths),
+            name="tool-worker",
+            daemon=True
+        )
+        process.start()
+        child_connection.close()
+        try:
+            parent_connection.recv()
+        except EOFError:
+            process.join(1)
+            raise RuntimeError(f"Tool worker failed to start (exit code {process.exitcode})")
+        return process, parent_connection
+
+    def _checkout(self, path, deadline, timeout):
+        with self.condition:
+            self.preload_paths.add(path)
+            while not self.idle and self.workers >= self.max_workers:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"Tool timed out after {timeout:g}s waiting for a free worker")
+                self.condition.wait(remaining)
+            if self.idle:
+                return self.idle.pop()
+            self.workers += 1
+            preload_paths = sorted(self.preload_paths)
+        try:
+            return self._spawn(preload_paths)
+        except BaseException:
+            with self.condition:
+                self.workers -= 1
+                self.condition.notify()
+            raise
+
+    def _checkin(self, worker, healthy):
+        if not healthy:
+            process, connection = worker
+            process.kill()
+            process.join()
+            connection.close()
+        with self.condition:
+            if healthy:
+                self.idle.append(worker)
+            else:
+                self.workers -= 1
+            self.condition.notify()
+
+    def call(self, path, arguments, timeout):
+        deadline = time.monotonic() + timeout
+        worker = self._checkout(path, deadline, timeout)
+        process, connection = worker
+        healthy = False
+        try:
+            connection.send((path, arguments))
+            if not connection.poll(timeout):
+                raise TimeoutError(f"Tool timed out after {timeout:g}s and its worker was restarted")
+            status, payload = connection.recv()
+            healthy = True
+        except TimeoutError:
+            raise
+        except (EOFError, OSError):
+            process.join(1)
+            raise RuntimeError(f"Tool worker exited unexpectedly (exit code {process.exitcode})")
+        finally:
+            self._checkin(worker, healthy)
+
+        if status == "error":
+            raise RuntimeError(payload)
+        return payload
+
+    def shutdown(self):
+        with self.condition:
+            workers, self.idle = self.idle, []
+            self.workers -= len(workers)
+        for process, connection in workers:
+            connection.close()
+            process.kill()
+
+def _get_process_pool(memory_mb):
+    with _pools_lock:
+        pool = _process_pools.get(memory_mb)
+        if pool is None:
+            pool = _process_pools[memory_mb] = ToolWorkerPool(TOOL_PROCESS_WORKERS, memory_mb)
+        return pool
+
+def _get_thread_pool():
+    global _thread_pool
+    with _pools_lock:
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(TOOL_THREAD_WORKERS, thread_name_prefix="tool")
+        return _thread_pool
+
+def _get_tool_slots(path, max_concurrency):
+    with _pools_lock:
+        slots = _tool_slots.get((path, max_concurrency))
+        if slots is None:
+            slots = _tool_slots[(path, max_concurrency)] = threading.BoundedSemaphore(max_concurrency)
+        return slots
+
+def shutdown_tool_pools():
+    with _pools_lock:
+        pools = list(_process_pools.values())
+        _process_pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
+atexit.register(shutdown_tool_pools)
+
+def execute_tool(tool, path, profile, arguments):
+    start_ns = time.time_ns()
+    slots = _get_tool_slots(path, profile["max_concurrency"]) if profile["max_concurrency"] else None
+    if slots is not None:
+        slots.acquire()
+    try:
+        if profile["mode"] == "process":
+            return _get_process_pool(profile["memory_mb"]).call(path, arguments, profile["timeout"])
+        if profile["mode"] == "inline":
+            return tool._run(**arguments)
+        try:
+            return _get_thread_pool().submit(tool._run, **arguments).result(profile["timeout"])
+        except FutureTimeoutError:
+            raise TimeoutError(f"Tool timed out after {profile['timeout']:g}s")
+    finally:
+        if slots is not None:
+            slots.release()
+        telemetry.record_span("tool.execute", start_ns, time.time_ns(), tool=tool.name, mode=profile["mode"])
+
+@lru_cache(maxsize=None)
+def _sandboxed_tool_class():
+    from langchain_core.tools import BaseTool
+    from typing import Any
+
+    class SandboxedTool(BaseTool):
+        tool: Any
+        tool_path: str
+        profile: dict
+        memoize: dict
+        version: str
+
+        def _run(self, **arguments):
+            if self.memoize["mode"] == "off":
+                return execute_tool(self.tool, self.tool_path, self.profile, arguments)
+            return memoized_call(
+                self.tool_path, self.version, self.memoize, arguments,
+                lambda: execute_tool(self.tool, self.tool_path, self.profile, arguments)
+            )
+
+    return SandboxedTool
+
+def wrap_tool(tool, path, profile=None, memoize=None, version=""):
+    profile = normalize_execution_profile(profile)
+    memoize = normalize_memoize_policy(memoize)
+    if profile["mode"] == "inline" and memoize["mode"] == "off":
+        return tool
+    return _sandboxed_tool_class()(
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema or tool.get_input_schema(),
+        return_direct=tool.return_direct,
+        tool=tool,
+        tool_path=os.path.abspath(path),
+        profile=profile,
+        memoize=memoize,
+        version=version
+    )
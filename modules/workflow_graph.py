@@ -0,0 +1,267 @@
+from modules.workflow_operations import adecide_next_node, compact_workflow, initial_run_state
+from modules.state_policy import normalize_state_policy, supervisor_view, agent_view, acompact_state
+from modules.checkpoints import WORKFLOW_CHECKPOINTS, save_checkpoint
+from modules.agent_operations import astream_agent, get_agents
+from modules.routing import normalize_routing, forced_route
+from modules.workflow_index import workflow_index, legal_targets, starts_workflow, split_next_nodes, rejected_feedback
+from modules import telemetry
+from collections import OrderedDict
+from contextlib import aclosing
+from typing_extensions import TypedDict
+from typing import Annotated, Optional
+from dotenv import load_dotenv
+import contextvars
+import threading
+import asyncio
+import hashlib
+import json
+import os
+
+load_dotenv()
+
+WORKFLOW_CACHE_SIZE = int(os.getenv("WORKFLOW_CACHE_SIZE", "32"))
+WORKFLOW_RECURSION_LIMIT = int(os.getenv("WORKFLOW_RECURSION_LIMIT", "100"))
+
+_compiled_workflows = OrderedDict()
+_compiled_workflows_lock = threading.Lock()
+workflow_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+_RESET_AGENT_OUTPUTS = object()
+
+def _merge_agent_outputs(left, right):
+    return {} if right is _RESET_AGENT_OUTPUTS else {**left, **right}
+
+class WorkflowState(TypedDict):
+    messages: list
+    current_nodes: list
+    workflow_started: bool
+    hop: int
+    hop_limit: int
+    feedback: Optional[str]
+    parent_checkpoint_id: Optional[str]
+    next_nodes: list
+    decision: Optional[dict]
+    usage: Optional[dict]
+    agent_outputs: Annotated[dict, _merge_agent_outputs]
+    final: Optional[str]
+
+def workflow_version(selected_workflow):
+    version_data = compact_workflow(selected_workflow) + json.dumps(
+        [selected_workflow.get("state_policy"), selected_workflow.get("routing"), selected_workflow.get("models")], sort_keys=True
+    )
+    return hashlib.sha256(version_data.encode('utf-8')).hexdigest()
+
+async def _detached(events):
+    from langchain_core.runnables.config import var_child_runnable_config
+
+    context = contextvars.copy_context()
+    context.run(var_child_runnable_config.set, None)
+    queue = asyncio.Queue()
+
+    async def pump():
+        try:
+            async for event in events:
+                await queue.put((event, None))
+            await queue.put((None, None))
+        except BaseException as error:
+            await queue.put((None, error))
+
+    task = asyncio.create_task(pump(), context=context)
+    try:
+        while True:
+            event, error = await queue.get()
+            if error is not None:
+                raise error
+            if event is None:
+                break
+            yield event
+    finally:
+        task.cancel()
+
+def agent_node_name(agent_id):
+    return f"agent_{agent_id}"
+
+def compile_workflow(selected_workflow):
+    from langchain_core.messages import AIMessage
+    from langgraph.config import get_stream_writer
+    from langgraph.graph import StateGraph, START, END
+
+    agent_ids = [node["agent_id"] for node in selected_workflow["workflow"]]
+    state_policy = normalize_state_policy(selected_workflow.get("state_policy"))
+    routing = normalize_routing(selected_workflow.get("routing"))
+    index = workflow_index(selected_workflow)
+
+    async def checkpoint_hop(state, config, messages, current_nodes, agent_outputs=None, final=None):
+        run_id = config["configurable"]["run_id"]
+        checkpoint_id = await asyncio.to_thread(
+            save_checkpoint, run_id, state["parent_checkpoint_id"], state["hop"], selected_workflow, messages, current_nodes,
+            state["workflow_started"], state["decision"], state["usage"], agent_outputs, final
+        )
+        return checkpoint_id, {"type": "checkpoint", "run_id": run_id, "checkpoint_id": checkpoint_id, "hop": state["hop"]}
+
+    async def finish(state, config, update, final):
+        write = get_stream_writer()
+        update["final"] = final
+        update["parent_checkpoint_id"], checkpoint_event = state["parent_checkpoint_id"], None
+        if WORKFLOW_CHECKPOINTS:
+            update["parent_checkpoint_id"], checkpoint_event = await checkpoint_hop({**state, **update}, config, update["messages"], state["current_nodes"], final=final)
+        write({"type": "final", "content": final})
+        if checkpoint_event is not None:
+            write(checkpoint_event)
+        return update
+
+    async def supervisor(state, config):
+        write = get_stream_writer()
+        hop = state["hop"] + 1
+        messages = list(state["messages"])
+        if hop > state["hop_limit"]:
+            telemetry.increment("hop_limits")
+            update = {"messages": messages, "hop": hop, "next_nodes": [], "decision": None, "usage": None, "feedback": None}
+            return await finish(state, config, update, f"Stopped after {index['max_hops']} hops without finishing the workflow.")
+        with telemetry.span("state.compact", hop=hop):
+            await acompact_state(messages, state_policy)
+
+        with telemetry.span("route.forced", hop=hop) as attributes:
+            decision = forced_route(selected_workflow, state["current_nodes"], messages, routing) if state["workflow_started"] else None
+            attributes["routed"] = decision is not None
+
+        usage = None
+        workflow_started = state["workflow_started"]
+        allowed = legal_targets(index, state["current_nodes"], workflow_started)
+        if decision is not None:
+            telemetry.increment("forced_routes")
+            write({"type": "supervisor", "decision": decision, "usage": None, "forced": True})
+        else:
+            with telemetry.span("supervisor", hop=hop) as attributes:
+                decision, usage = await adecide_next_node(supervisor_view(messages, state_policy), selected_workflow, allowed, state["feedback"])
+                attributes.update(usage)
+            telemetry.increment("supervisor_calls")
+            allowed = legal_targets(index, state["current_nodes"], workflow_started, decision)
+            write({"type": "supervisor", "decision": decision, "usage": usage, "forced": False})
+
+        next_nodes, rejected = split_next_nodes(decision, allowed)
+        if rejected:
+            telemetry.increment("illegal_transitions", len(rejected))
+        starting = starts_workflow(state["current_nodes"], workflow_started)
+        if next_nodes or not rejected:
+            workflow_started = decision.get("workflow_started", True)
+        update = {
+            "messages": messages, "hop": hop, "workflow_started": workflow_started, "next_nodes": next_nodes, "decision": decision, "usage": usage,
+            "feedback": rejected_feedback(rejected, state["current_nodes"], allowed, starting) if rejected and not next_nodes else None
+        }
+        if not next_nodes and "FINISH" in decision["next_nodes"]:
+            return await finish(state, config, update, decision.get("direct_response") or "Workflow complete.")
+        elif next_nodes:
+            update["messages"] = messages + [AIMessage(content=decision['instructions'], name="supervisor")]
+        return update
+
+    def route(state):
+        if state["final"] is not None:
+            return END
+        if state["next_nodes"]:
+            return [agent_node_name(agent_id) for agent_id in state["next_nodes"]]
+        return "supervisor"
+
+    def agent_node(agent_id):
+        async def run_agent(state):
+            write = get_stream_writer()
+            agents = await asyncio.to_thread(get_agents, [agent_id])
+            if not agents:
+                return {}
+            agent = agents[0]
+            message = None
+            with telemetry.span("agents", hop=state["hop"], agents=1):
+                async for event in _detached(astream_agent(agent, agent_view(state["messages"], state_policy, agent))):
+                    write(event)
+                    if event["type"] == "agent_message":
+                        message = event["message"]
+            return {"agent_outputs": {agent_id: {"agent_name": agent["agent_name"], "message": message}}}
+        return run_agent
+
+    async def merge(state, config):
+        outputs = state["agent_outputs"]
+        messages = state["messages"] + [
+            outputs[agent_id]["message"] for agent_id in state["next_nodes"]
+            if agent_id in outputs and outputs[agent_id]["message"] is not None
+        ]
+        current_nodes = [agent_id for agent_id in state["next_nodes"] if agent_id in outputs]
+        update = {"messages": messages, "current_nodes": current_nodes, "agent_outputs": _RESET_AGENT_OUTPUTS}
+        if WORKFLOW_CHECKPOINTS:
+            update["parent_checkpoint_id"], checkpoint_event = await checkpoint_hop(state, config, messages, current_nodes, {
+                agent_id: {"agent_name": output["agent_name"], "content": output["message"].content}
+                for agent_id, output in outputs.items() if output["message"] is not None
+            })
+            get_stream_writer()(checkpoint_event)
+        return update
+
+    graph = StateGraph(WorkflowState)
+    graph.add_node("supervisor", supervisor)
+    graph.add_node("merge", merge)
+    for agent_id in dict.fromkeys(agent_ids):
+        graph.add_node(agent_node_name(agent_id), agent_node(agent_id))
+        graph.add_edge(agent_node_name(agent_id), "merge")
+    graph.add_edge(START, "supervisor")
+    graph.add_conditional_edges(
+        "supervisor",
+        route,
+        [agent_node_name(agent_id) for agent_id in dict.fromkeys(agent_ids)] + ["supervisor", END]
+    )
+    graph.add_edge("merge", "supervisor")
+    return graph.compile(name=selected_workflow.get("workflow_name") or "workflow")
+
+def get_compiled_workflow(selected_workflow):
+    cache_key = (selected_workflow.get("workflow_id"), workflow_version(selected_workflow))
+
+    with _compiled_workflows_lock:
+        compiled_graph = _compiled_workflows.get(cache_key)
+        if compiled_graph is not None:
+            _compiled_workflows.move_to_end(cache_key)
+            workflow_cache_stats["hits"] += 1
+            return compiled_graph
+        workflow_cache_stats["misses"] += 1
+
+    with telemetry.span("workflow.compile", workflow=selected_workflow.get("workflow_name")):
+        compiled_graph = compile_workflow(selected_workflow)
+
+    with _compiled_workflows_lock:
+        for key in [key for key in _compiled_workflows if key[0] == cache_key[0] and key != cache_key]:
+            del _compiled_workflows[key]
+        _compiled_workflows[cache_key] = compiled_graph
+        _compiled_workflows.move_to_end(cache_key)
+        while len(_compiled_workflows) > WORKFLOW_CACHE_SIZE:
+            _compiled_workflows.popitem(last=False)
+            workflow_cache_stats["evictions"] += 1
+
+    return compiled_graph
+
+def invalidate_compiled_workflow(workflow_id=None):
+    with _compiled_workflows_lock:
+        for key in [key for key in _compiled_workflows if workflow_id is None or key[0] == workflow_id]:
+            del _compiled_workflows[key]
+
+async def astream_graph_hops(selected_workflow, user_prompt, checkpoint=None, run_id=None):
+    run_state = initial_run_state(user_prompt, checkpoint)
+    if run_state["final"] is not None:
+        yield {"type": "final", "content": run_state["final"]}
+        return
+
+    compiled_graph = await asyncio.to_thread(get_compiled_workflow, selected_workflow)
+    max_hops = workflow_index(selected_workflow)["max_hops"]
+    initial_state = {
+        "messages": run_state["messages"],
+        "current_nodes": run_state["current_nodes"],
+        "workflow_started": run_state["workflow_started"],
+        "hop": run_state["hop"],
+        "hop_limit": run_state["hop"] + max_hops,
+        "feedback": None,
+        "parent_checkpoint_id": run_state["checkpoint_id"],
+        "next_nodes": [],
+        "decision": None,
+        "usage": None,
+        "agent_outputs": {},
+        "final": None
+    }
+    config = {"configurable": {"run_id": run_id}, "recursion_limit": max(WORKFLOW_RECURSION_LIMIT, 3 * max_hops + 2)}
+    async with aclosing(compiled_graph.astream(initial_state, config, stream_mode="custom")) as events:
+        async for event in events:
+            yield event
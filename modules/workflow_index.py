@@ -0,0 +1,141 @@
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+WORKFLOW_MAX_HOPS = int(os.getenv("WORKFLOW_MAX_HOPS", "25"))
+
+REJECTED_DECISION = """
+Your previous decision {rejected} is not a legal transition: those nodes are not in the `connects` of the node(s) that just finished ({current_nodes}).
+Choose `next_nodes` only from {allowed}, or ["FINISH"] if the task is complete.
+"""
+
+REJECTED_START = """
+Your previous decision {rejected} is not a legal start: the workflow has to begin at an agent that no other agent hands off to.
+Choose `next_nodes` only from {allowed}, or set `workflow_started` to false if you are only asking agent(s) about themselves.
+"""
+
+def _strongly_connected(node_ids, successors):
+    index_of, lowlink, on_stack, stack, components = {}, {}, set(), [], []
+
+    def visit(node):
+        index_of[node] = lowlink[node] = len(index_of)
+        stack.append(node)
+        on_stack.add(node)
+        for successor in successors[node]:
+            if successor not in index_of:
+                visit(successor)
+                lowlink[node] = min(lowlink[node], lowlink[successor])
+            elif successor in on_stack:
+                lowlink[node] = min(lowlink[node], index_of[successor])
+        if lowlink[node] == index_of[node]:
+            component = []
+            while True:
+                member = stack.pop()
+                on_stack.discard(member)
+                component.append(member)
+                if member == node:
+                    break
+            components.append(component)
+
+    for node in node_ids:
+        if node not in index_of:
+            visit(node)
+    return components
+
+def _reachable(node, successors):
+    seen, pending = set(), list(successors[node])
+    while pending:
+        current = pending.pop()
+        if current not in seen:
+            seen.add(current)
+            pending.extend(successors[current])
+    return seen
+
+def build_index(nodes):
+    if not nodes:
+        raise ValueError("A workflow needs at least one agent")
+
+    node_ids = [node["agent_id"] for node in nodes]
+    if len(set(node_ids)) != len(node_ids):
+        raise ValueError("Each agent can appear only once in a workflow")
+
+    successors = {node["agent_id"]: list(dict.fromkeys(node.get("connects") or [])) for node in nodes}
+    for node_id, targets in successors.items():
+        if node_id in targets:
+            raise ValueError(f"Agent {node_id} cannot connect to itself")
+        unknown = [target for target in targets if target not in successors]
+        if unknown:
+            raise ValueError(f"Agent {node_id} connects to agent(s) outside the workflow: {', '.join(unknown)}")
+
+    components = _strongly_connected(node_ids, successors)
+    component_of = {node: position for position, component in enumerate(components) for node in component}
+    has_incoming = {component_of[target] for node_id in node_ids for target in successors[node_id] if component_of[target] != component_of[node_id]}
+    entry_nodes = [node_id for node_id in node_ids if component_of[node_id] not in has_incoming]
+    terminal_nodes = [node_id for node_id in node_ids if not successors[node_id]]
+    cycles = [sorted(component, key=node_ids.index) for component in components if len(component) > 1]
+    reachable = {node_id: [node for node in node_ids if node in _reachable(node_id, successors)] for node_id in node_ids}
+
+    max_depth = None
+    if not cycles:
+        depth = {}
+        for component in components:
+            node_id = component[0]
+            depth[node_id] = 1 + max((depth[successor] for successor in successors[node_id]), default=0)
+        max_depth = max(depth.values())
+
+    return {
+        "successors": successors,
+        "entry_nodes": entry_nodes,
+        "terminal_nodes": terminal_nodes,
+        "cycles": cycles,
+        "reachable": reachable,
+        "max_depth": max_depth,
+        "max_hops": 2 * (max_depth + 1) if max_depth is not None else None
+    }
+
+def index_warnings(index):
+    warnings = [f"Agents {', '.join(cycle)} form a cycle; runs stop after {WORKFLOW_MAX_HOPS} hops (WORKFLOW_MAX_HOPS)" for cycle in index["cycles"]]
+    terminal_nodes = set(index["terminal_nodes"])
+    stuck = [node_id for node_id, reachable in index["reachable"].items() if node_id not in terminal_nodes and not terminal_nodes.intersection(reachable)]
+    if stuck:
+        warnings.append(f"Agent(s) {', '.join(stuck)} cannot reach an agent without connections, so only the supervisor can finish from there")
+    return warnings
+
+def workflow_index(selected_workflow):
+    index = selected_workflow.get("index") or build_index(selected_workflow["workflow"])
+    routing = selected_workflow.get("routing") or {}
+    return {
+        "nodes": frozenset(index["successors"]),
+        "successors": {node_id: frozenset(targets) for node_id, targets in index["successors"].items()},
+        "entry_nodes": frozenset(index["entry_nodes"]),
+        "max_hops": routing.get("max_hops") or index["max_hops"] or WORKFLOW_MAX_HOPS
+    }
+
+def starts_workflow(current_nodes, workflow_started):
+    return not workflow_started or not current_nodes
+
+def legal_targets(index, current_nodes, workflow_started, decision=None):
+    if decision is not None and not decision.get("workflow_started", True):
+        return index["nodes"]
+    if starts_workflow(current_nodes, workflow_started):
+        return index["entry_nodes"]
+    if len(current_nodes) == 1:
+        return index["successors"].get(current_nodes[0], frozenset())
+    return frozenset().union(*(index["successors"].get(node_id, frozenset()) for node_id in current_nodes))
+
+def split_next_nodes(decision, allowed):
+    next_nodes, rejected = [], []
+    for node_id in dict.fromkeys(decision["next_nodes"]):
+        if node_id != "FINISH":
+            (next_nodes if node_id in allowed else rejected).append(node_id)
+    return next_nodes, rejected
+
+def rejected_feedback(rejected, current_nodes, allowed, starting):
+    if starting:
+        return REJECTED_START.format(rejected=rejected, allowed=sorted(allowed)).strip()
+    return REJECTED_DECISION.format(
+        rejected=rejected,
+        current_nodes=", ".join(current_nodes) or "none",
+        allowed=sorted(allowed)
+    ).strip()
@@ -1,13 +1,33 @@
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from modules.agent_operations import fetch_agents, display_agents, invoke_agent
-from typing_extensions import TypedDict
+from modules.agent_operations import fetch_agents, display_agents, astream_agent, get_agents
+from modules.state_policy import STATE_POLICY_MODES, normalize_state_policy, supervisor_view, agent_view, acompact_state
+from modules.routing import normalize_routing, forced_route
+from modules.workflow_index import build_index, index_warnings, workflow_index, legal_targets, starts_workflow, split_next_nodes, rejected_feedback
+from modules.repository import iter_documents, invalidate
+from modules.checkpoints import WORKFLOW_CHECKPOINTS, new_run_id, save_checkpoint, restore_state
+from modules.run_log import start_run_log
+from modules import telemetry
+from typing_extensions import TypedDict, List
 from typing import Annotated, Optional
-from modules.llm_config import llm
-from modules.db_config import db
+from functools import lru_cache
+from modules.llm_config import get_llm, normalize_models
+from modules.db_config import get_db
+import asyncio
 import json
+import os
+
+TRACE_SUMMARY = os.getenv("TRACE_SUMMARY", "false").lower() in ("1", "true", "yes")
+WORKFLOW_ENGINE = os.getenv("WORKFLOW_ENGINE", "loop").lower()
+
+class DecidingSupervisorResponseFormat(TypedDict):
+    next_nodes: Annotated[List[str], ..., "Node IDs"]
+    reasoning: Annotated[str, ..., "Reasoning"]
+    instructions: Annotated[str, ..., "Instructions"]
+    direct_response: Annotated[Optional[str], None, "Response to user"]
+    workflow_started: Annotated[bool, ..., "Whether this decision starts or continues the user's task workflow"]
+    confidence: Annotated[Optional[float], None, "Confidence from 0 to 1 that next_nodes is the right decision"]
 
 def create_workflow():
-    workdlows_collection = db['workflows']
+    workdlows_collection = get_db()['workflows']
 
     agents = fetch_agents()
     display_agents(agents)
@@ -62,9 +82,25 @@ def create_workflow():
             "connects": connects
         })
 
+    try:
+        index = build_index(workflow_nodes)
+    except ValueError as error:
+        print(f"\n❌ Invalid workflow graph: {error}. ❌")
+        return
+    for warning in index_warnings(index):
+        print(f"\n⚠️ {warning}.")
+
+    state_policy = select_state_policy()
+    fast_path = input("Route forced transitions (single or no connections) without the supervisor? (Y/n): ").strip().lower() != "n"
+    routing = normalize_routing({"fast_path": fast_path})
+    models = select_models()
+
     print("\n\n✅ Workflow Details:")
     print(f"Name: {workflow_name}")
     print(f"Description: {workflow_description}")
+    print(f"State Policy: {state_policy}")
+    print(f"Routing: {routing}")
+    print(f"Models: {models}")
     print("Nodes:")
     for node in workflow_nodes:
         print(f"  - Obj ID: {node['agent_id']}, Name: {node['name']}, Connects: {node['connects']}")
@@ -72,32 +108,81 @@ def create_workflow():
     workflow_data = {
         "workflow_name": workflow_name,
         "workflow_description": workflow_description,
-        "workflow": workflow_nodes
+        "workflow": workflow_nodes,
+        "state_policy": state_policy,
+        "routing": routing,
+        "models": models,
+        "index": index
     }
 
     result = workdlows_collection.insert_one(workflow_data)
+    invalidate("workflows", result.inserted_id)
 
     print(f"\n✅ Created workflow with object id: {result.inserted_id}")
 
+def select_state_policy():
+    while True:
+        mode = input(f"\nEnter state policy ({'/'.join(STATE_POLICY_MODES)}) or press Enter for full: ").strip().lower() or "full"
+        limit = None
+        if mode in ("window", "summary"):
+            limit = input("Enter the number of recent messages to keep or press Enter for default: ").strip()
+        elif mode == "tokens":
+            limit = input("Enter the token budget for the history or press Enter for default: ").strip()
+        agent_scope = input("Show each agent only the messages addressed to it? (y/N): ").strip().lower() == "y"
+
+        try:
+            return normalize_state_policy({"mode": mode, "limit": limit, "agent_scope": agent_scope})
+        except ValueError:
+            print("\n❌ Invalid state policy. Please try again. ❌")
+
+def select_models():
+    while True:
+        models = {}
+        supervisor = input("\nEnter the supervisor model or press Enter for default: ").strip()
+        if supervisor:
+            models["supervisor"] = supervisor
+        adaptive = input("Escalate low-confidence or unparseable supervisor decisions to a bigger model? (y/n) or press Enter for default: ").strip().lower()
+        if adaptive in ("y", "n"):
+            models["adaptive"] = adaptive == "y"
+        if adaptive != "n":
+            escalation = input("Enter the escalation model or press Enter for default: ").strip()
+            min_confidence = input("Enter the minimum confidence (0-1) or press Enter for default: ").strip()
+            if escalation:
+                models["escalation"] = escalation
+            if min_confidence:
+                models["min_confidence"] = min_confidence
+
+        try:
+            normalized = normalize_models(models)
+        except ValueError:
+            print("\n❌ Invalid model settings. Please try again. ❌")
+            continue
+        if "min_confidence" in models:
+            models["min_confidence"] = normalized["min_confidence"]
+        return models
+
+def format_workflow(workflow):
+    return {
+        "workflow_id": str(workflow.get("_id")),
+        "workflow_name": workflow.get("workflow_name"),
+        "workflow_description": workflow.get("workflow_description"),
+        "workflow": workflow.get("workflow"),
+        "state_policy": workflow.get("state_policy"),
+        "routing": workflow.get("routing"),
+        "models": workflow.get("models"),
+        "index": workflow.get("index")
+    }
+
+def iter_workflows(page_size=None):
+    for i, workflow in enumerate(iter_documents("workflows", page_size=page_size), start=1):
+        yield {"reference_id": i, **format_workflow(workflow)}
+
 def fetch_workflows():
-    workflows_collection = db['workflows']
-    workflows = workflows_collection.find()
-
-    available_workflows = []
-    for i, workflow in enumerate(workflows, start=1):
-        available_workflows.append({
-            "reference_id": i,
-            "workflow_id": str(workflow.get("_id")),
-            "workflow_name": workflow.get("workflow_name"),
-            "workflow_description": workflow.get("workflow_description"),
-            "workflow": workflow.get("workflow")
-        })
-    
-    return available_workflows
+    return list(iter_workflows())
 
 def display_workflows(workflows):
-    if workflows is None or len(workflows) == 0:
-        workflows = fetch_workflows()
+    if not workflows:
+        workflows = iter_workflows()
     print("\n\nAvailable Workflows:\n")
     for workflow in workflows:
         print(f"  - Reference ID: {workflow['reference_id']}, Workflow ID: {workflow['workflow_id']}, Name: {workflow['workflow_name']}, Description: {workflow['workflow_description']}")
@@ -120,142 +205,381 @@ def select_workflow():
 
     return selected_workflow
 
-def decide_next_node(state, selected_workflow):
-    class DecidingSupervisorResponseFormat(TypedDict):
-        next_node: Annotated[str, ..., "Node ID"]
-        reasoning: Annotated[str, ..., "Reasoning"]
-        instructions: Annotated[str, ..., "Instructions"]
-        direct_response: Annotated[Optional[str], None, "Response to user"]
-    
-    deciding_supervisor_prompt = f"""
-        You are a **supervising node/agent** in a directed graph-based team workflow.
-        Your job is to oversee and manage task delegation until the user's original task is fully completed.
+SUPERVISOR_PROMPT = """
+You are a **supervising node/agent** in a directed graph-based team workflow.
+Your job is to oversee and manage task delegation until the user's original task is fully completed.
 
-        Each team member is a node/agent in a graph, connected through the `connects` field.
-        When a node finishes its part of the task, you—the supervisor—are informed.
-        You must then decide which connected node should handle the next part of the task.
-        Delegation is only allowed to nodes listed in the current node’s `connects`.
-        Each agent may or may not have a set of tools, the details of which can only be answered by the node itself.
+Each team member is a node/agent in a graph, connected through the `connects` field.
+When a node finishes its part of the task, you—the supervisor—are informed.
+You must then decide which connected node should handle the next part of the task.
+Delegation is only allowed to nodes listed in the current node’s `connects`.
+Each agent may or may not have a set of tools, the details of which can only be answered by the node itself.
 
-        ---
+---
 
-        ### 🎯 Primary Objective:
+### 🎯 Primary Objective:
 
-        Ensure the **user's task is fully and efficiently completed** by coordinating the workflow through the graph of capable agents.
+Ensure the **user's task is fully and efficiently completed** by coordinating the workflow through the graph of capable agents.
 
-        ---
+---
 
-        ### 🧠 Your Responsibilities:
+### 🧠 Your Responsibilities:
 
-        - Understand the **user’s overall task** and the **team structure**.
-        - Break down the task into logical subtasks using each member’s `description`.
-        - After each node completes a task:
-        - Assess progress made so far.
-        - Choose the next node from the available `connects`.
-        - Provide the selected node with:
-            - Relevant task context.
-            - A clear description of what they need to do.
-            - Any work already completed.
+- Understand the **user’s overall task** and the **team structure**.
+- Break down the task into logical subtasks using each member’s `description`.
+- After each node completes a task:
+- Assess progress made so far.
+- Choose the next node from the available `connects`.
+- Provide the selected node with:
+    - Relevant task context.
+    - A clear description of what they need to do.
+    - Any work already completed.
 
-        - Avoid unnecessary or redundant assignments.
-        - Make decisions based on:
-            - **Skill alignment**
-            - **Task continuity**
-            - **Workflow logic**
+- Avoid unnecessary or redundant assignments.
+- Make decisions based on:
+    - **Skill alignment**
+    - **Task continuity**
+    - **Workflow logic**
 
-        ---
+---
 
-        ### 🧾 You Will Receive:
+### 🧾 You Will Receive:
 
-        - The full **team structure**, including:
-        - `name`, `node` (ID), `description`, and `connects` for each team member.
-        - The **original user task**.
-        - The **current state**, including:
-            - The node that just completed its work.
-            - Progress or outputs so far.
-            - Chat history and context (always check this before deciding).
+- The full **team structure**, including:
+- `name`, `node` (ID), `description`, and `connects` for each team member.
+- The **original user task**.
+- The **current state**, including:
+    - The node that just completed its work.
+    - Progress or outputs so far.
+    - Chat history and context (always check this before deciding).
 
-        ---
+---
 
-        ### 🧾 Your Output Must Include:
+### 🧾 Your Output Must Include:
 
-        1. **next_node**: ID of the next node (or `FINISH` if the task is done).
-        2. **reasoning**: Justify why this node was chosen, based on the user query, their description and graph connections.
-        3. **instructions**: Provide only the specific question or request the user asked.
-        4. **direct_response**: A response to the user – only use when you give `next_node` as `FINISH`.
+1. **next_nodes**: List of IDs of the next node(s) (or `["FINISH"]` if the task is done).
+    - Give more than one ID only when those nodes can work **independently and in parallel** on the same instructions (e.g., querying several agents at once).
+2. **reasoning**: Justify why this node was chosen, based on the user query, their description and graph connections.
+3. **instructions**: Provide only the specific question or request the user asked.
+4. **direct_response**: A response to the user – only use when you give `next_nodes` as `["FINISH"]`.
+5. **workflow_started**: `true` if this decision starts or continues the user's task through the workflow graph; `false` for greetings, general questions and questions **about agent(s)**.
+6. **confidence**: How sure you are, from 0 to 1, that `next_nodes` is the right decision.
 
-        ---
+---
 
-        ### ⚠️ Constraints:
+### ⚠️ Constraints:
 
-        - You **can only choose from the current node’s `connects`**.
-        - Never allow a node to delegate to itself.
-        - If `connects` of previously used agent is empty, or the user just asked a general question (e.g., greetings or “what is your role”), respond with `FINISH` in `next_node`.
-        - Once the workflow has started you may not finish until it’s complete (the previous agent has no connects).
-        - Don’t assign tasks unless necessary—be efficient and purposeful.
-        - Ensure each node receives enough information to pick up the task without confusion.
-        - Stick to what user asked for and don't at all respond or ask your agents to respond with stuff user didn't ask for.
-        - If the user's message is only requesting **information about agent(s)** (e.g., tools, roles, capabilities), DO NOT interpret it as the start or continuation of a workflow. Only gather and return the requested information.
+- You **can only choose from the current node’s `connects`**.
+- Never allow a node to delegate to itself.
+- If `connects` of previously used agent is empty, or the user just asked a general question (e.g., greetings or “what is your role”), respond with `["FINISH"]` in `next_nodes`.
+- Once the workflow has started you may not finish until it’s complete (the previous agent has no connects).
+- Don’t assign tasks unless necessary—be efficient and purposeful.
+- Ensure each node receives enough information to pick up the task without confusion.
+- Stick to what user asked for and don't at all respond or ask your agents to respond with stuff user didn't ask for.
+- If the user's message is only requesting **information about agent(s)** (e.g., tools, roles, capabilities), DO NOT interpret it as the start or continuation of a workflow. Only gather and return the requested information.
 
 
-        **❗ Strict Behavior Rule:**
-        - When responding to a user request **about agent(s)**, you must ensure:
-            - Agents respond **only to the question asked**, such as their capabilities, tools, or status.
-            - Agents must **not begin performing their usual tasks** unless the user explicitly asks them to.
-            - If you are querying multiple agents on behalf of the user, provide only the **exact query context** in `instructions`—do not imply task initiation.
-            - DO NOT `FINISH` before asking the agent.
-        ---
+**❗ Strict Behavior Rule:**
+- When responding to a user request **about agent(s)**, you must ensure:
+    - Agents respond **only to the question asked**, such as their capabilities, tools, or status.
+    - Agents must **not begin performing their usual tasks** unless the user explicitly asks them to.
+    - If you are querying multiple agents on behalf of the user, list all of them in `next_nodes` in a single decision and provide only the **exact query context** in `instructions`—do not imply task initiation.
+    - DO NOT `FINISH` before asking the agent.
+---
 
-        ### 💬 Special Instruction:
+### 💬 Special Instruction:
 
-        - You orchestrate the <given workflow> to ensure the user’s task is completed efficiently.
-        - If the user asks about **any specific or all agent(s)** and you do **not already know** the answer:
-            - You MUST **invoke and query** the relevant agent(s) directly to get accurate information.
-            - You MUST prevent any agent from taking action **beyond answering** the specific user query.
-            - Never assume or guess an agent's internal capabilities or tools unless explicitly provided.
-            - ⚠️ If the user only asked about a **specific agent or their properties**, you need **NOT** follow with the workflow/graph or assign new tasks afterward—only return the requested information.
-            - ⚠️ If the user asks about **all agents**, gather the requested information from each one, then return `FINISH` after collecting their responses. Do not initiate or resume the task workflow unless the user explicitly asks for it.
+- You orchestrate the <given workflow> to ensure the user’s task is completed efficiently.
+- If the user asks about **any specific or all agent(s)** and you do **not already know** the answer:
+    - You MUST **invoke and query** the relevant agent(s) directly to get accurate information.
+    - You MUST prevent any agent from taking action **beyond answering** the specific user query.
+    - Never assume or guess an agent's internal capabilities or tools unless explicitly provided.
+    - ⚠️ If the user only asked about a **specific agent or their properties**, you need **NOT** follow with the workflow/graph or assign new tasks afterward—only return the requested information.
+    - ⚠️ If the user asks about **all agents**, gather the requested information from each one, then return `FINISH` after collecting their responses. Do not initiate or resume the task workflow unless the user explicitly asks for it.
 
-        Then provide the workflow details from the `Given Workflow` section below.
+Then provide the workflow details from the `Given Workflow` section below.
 
-        ---
+---
 
-        ### 🧩 Given Workflow:
-        {json.dumps(selected_workflow, indent=2)}
-    """
+### 🧩 Given Workflow:
+"""
 
+@lru_cache(maxsize=128)
+def supervisor_system_message(workflow_json):
+    from langchain_core.messages import SystemMessage
 
-    messages = [SystemMessage(content=deciding_supervisor_prompt)] + state
+    return SystemMessage(content=SUPERVISOR_PROMPT + workflow_json)
 
-    supervisor_response = llm.with_structured_output(DecidingSupervisorResponseFormat).invoke(messages)
+def compact_workflow(selected_workflow):
+    workflow = {key: selected_workflow.get(key) for key in ("workflow_id", "workflow_name", "workflow_description", "workflow")}
+    return json.dumps(workflow, separators=(",", ":"), ensure_ascii=False)
 
-    return supervisor_response
+def supervisor_messages(state, selected_workflow):
+    return [supervisor_system_message(compact_workflow(selected_workflow))] + state
 
-def invoke_workflow():
-    try:
-        selected_workflow = select_workflow()
-        agent_ids = [node["agent_id"] for node in selected_workflow["workflow"]] + ["FINISH"]
-    except Exception:
+def supervisor_usage(raw_response, model):
+    usage = getattr(raw_response, "usage_metadata", None) or {}
+    return {
+        "model": model,
+        "prompt_tokens": usage.get("input_tokens", 0),
+        "cached_prompt_tokens": usage.get("input_token_details", {}).get("cache_read", 0),
+        "completion_tokens": usage.get("output_tokens", 0)
+    }
+
+def needs_escalation(decision, selected_workflow, min_confidence, allowed=None):
+    if decision is None:
+        return True
+    if allowed is None or not decision.get("workflow_started", True):
+        allowed = {node["agent_id"] for node in selected_workflow["workflow"]}
+    if not decision.get("next_nodes") or any(node != "FINISH" and node not in allowed for node in decision["next_nodes"]):
+        return True
+    confidence = decision.get("confidence")
+    return confidence is not None and confidence < min_confidence
+
+async def _adecide(model, messages, handler):
+    supervisor_output = await get_llm(model).with_structured_output(DecidingSupervisorResponseFormat, include_raw=True).ainvoke(
+        messages,
+        {"callbacks": [handler]} if handler else None
+    )
+    error = supervisor_output["parsing_error"] or ValueError("Supervisor returned no routing decision")
+    return supervisor_output["parsed"], supervisor_usage(supervisor_output["raw"], model), error
+
+async def adecide_next_node(state, selected_workflow, allowed=None, feedback=None):
+    from langchain_core.messages import SystemMessage
+
+    messages = supervisor_messages(state, selected_workflow)
+    if feedback:
+        messages.append(SystemMessage(content=feedback))
+    models = normalize_models(selected_workflow.get("models"))
+
+    handler = telemetry.callback_handler(role="supervisor")
+    decision, usage, error = await _adecide(models["supervisor"], messages, handler)
+
+    if models["adaptive"] and models["escalation"] != models["supervisor"] and needs_escalation(decision, selected_workflow, models["min_confidence"], allowed):
+        telemetry.increment("supervisor_escalations")
+        with telemetry.span("supervisor.escalate", model=models["escalation"]):
+            decision, escalated_usage, error = await _adecide(models["escalation"], messages, handler)
+        usage = {
+            **{key: usage[key] + escalated_usage[key] for key in ("prompt_tokens", "cached_prompt_tokens", "completion_tokens")},
+            "model": models["escalation"],
+            "escalated_from": usage["model"]
+        }
+
+    if decision is None:
+        raise error
+    return decision, usage
+
+async def astream_agents(agents, state, state_policy=None):
+    if len(agents) == 1:
+        async for event in astream_agent(agents[0], agent_view(state, state_policy, agents[0])):
+            yield event
         return
 
-    user_prompt = input("\nYou: ")
-    state = [HumanMessage(content=user_prompt, name="user")]
+    queue = asyncio.Queue()
+
+    async def pump(agent):
+        try:
+            async for event in astream_agent(agent, agent_view(state, state_policy, agent)):
+                await queue.put(event)
+        finally:
+            await queue.put(None)
+
+    tasks = [asyncio.create_task(pump(agent)) for agent in agents]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            event = await queue.get()
+            if event is None:
+                remaining -= 1
+                continue
+            yield event
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def astream_workflow(selected_workflow, user_prompt, checkpoint=None, run_id=None):
+    run_id = run_id or new_run_id()
+    run = telemetry.start_run(
+        "workflow",
+        workflow_id=selected_workflow.get("workflow_id"),
+        workflow_name=selected_workflow.get("workflow_name"),
+        run_id=run_id
+    )
+    if WORKFLOW_ENGINE == "graph":
+        from modules.workflow_graph import astream_graph_hops as astream_hops
+    else:
+        astream_hops = astream_workflow_hops
+    recorder = start_run_log(run_id, selected_workflow, user_prompt, checkpoint)
+    try:
+        async for event in astream_hops(selected_workflow, user_prompt, checkpoint, run_id):
+            if recorder is not None:
+                recorder.record(event)
+            yield event
+    except BaseException as error:
+        summary = telemetry.finish_run(run)
+        if recorder is not None:
+            recorder.finish(summary, error)
+        raise
+    summary = telemetry.finish_run(run)
+    if recorder is not None:
+        recorder.finish(summary)
+    yield {"type": "trace", "summary": summary}
+
+def initial_run_state(user_prompt, checkpoint=None):
+    from langchain_core.messages import HumanMessage
+
+    if checkpoint is None:
+        return {
+            "messages": [HumanMessage(content=user_prompt, name="user")],
+            "current_nodes": [],
+            "workflow_started": False,
+            "hop": 0,
+            "checkpoint_id": None,
+            "final": None
+        }
+
+    run_state = {
+        "messages": restore_state(checkpoint),
+        "current_nodes": checkpoint["current_nodes"],
+        "workflow_started": checkpoint["workflow_started"],
+        "hop": checkpoint["hop"],
+        "checkpoint_id": checkpoint["checkpoint_id"],
+        "final": checkpoint["final"]
+    }
+    if user_prompt:
+        run_state["messages"].append(HumanMessage(content=user_prompt, name="user"))
+        run_state["workflow_started"] = False
+        run_state["final"] = None
+    return run_state
+
+async def astream_workflow_hops(selected_workflow, user_prompt, checkpoint=None, run_id=None):
+    from langchain_core.messages import AIMessage
+
+    state_policy = normalize_state_policy(selected_workflow.get("state_policy"))
+    routing = normalize_routing(selected_workflow.get("routing"))
+    index = workflow_index(selected_workflow)
+
+    run_state = initial_run_state(user_prompt, checkpoint)
+    if run_state["final"] is not None:
+        yield {"type": "final", "content": run_state["final"]}
+        return
+    state = run_state["messages"]
+    current_nodes = run_state["current_nodes"]
+    workflow_started = run_state["workflow_started"]
+    hop = run_state["hop"]
+    hop_limit = hop + index["max_hops"]
+    parent_id = run_state["checkpoint_id"]
+    feedback = None
+
+    async def checkpoint_hop(decision, usage, agent_outputs=None, final=None):
+        nonlocal parent_id
+        parent_id = await asyncio.to_thread(
+            save_checkpoint, run_id, parent_id, hop, selected_workflow, state, current_nodes,
+            workflow_started, decision, usage, agent_outputs, final
+        )
+        return {"type": "checkpoint", "run_id": run_id, "checkpoint_id": parent_id, "hop": hop}
 
-    supervisor_response = ""
     while True:
-        supervisor_response = decide_next_node(state, selected_workflow)
-        if supervisor_response["next_node"] == "FINISH":
-            if "direct_response" in supervisor_response:
-                print(f"\n{supervisor_response["direct_response"]}\n")
-            else:
-                print("\nWorkflow complete.\n")
+        hop += 1
+        if hop > hop_limit:
+            telemetry.increment("hop_limits")
+            final = f"Stopped after {index['max_hops']} hops without finishing the workflow."
+            checkpoint_event = await checkpoint_hop(None, None, final=final) if WORKFLOW_CHECKPOINTS else None
+            yield {"type": "final", "content": final}
+            if checkpoint_event is not None:
+                yield checkpoint_event
             break
-        elif supervisor_response["next_node"] in agent_ids:
+
+        with telemetry.span("state.compact", hop=hop):
+            await acompact_state(state, state_policy)
+
+        with telemetry.span("route.forced", hop=hop) as attributes:
+            supervisor_response = forced_route(selected_workflow, current_nodes, state, routing) if workflow_started else None
+            attributes["routed"] = supervisor_response is not None
+
+        usage = None
+        allowed = legal_targets(index, current_nodes, workflow_started)
+        if supervisor_response is not None:
+            telemetry.increment("forced_routes")
+            yield {"type": "supervisor", "decision": supervisor_response, "usage": None, "forced": True}
+        else:
+            with telemetry.span("supervisor", hop=hop) as attributes:
+                supervisor_response, usage = await adecide_next_node(supervisor_view(state, state_policy), selected_workflow, allowed, feedback)
+                attributes.update(usage)
+            telemetry.increment("supervisor_calls")
+            allowed = legal_targets(index, current_nodes, workflow_started, supervisor_response)
+            yield {"type": "supervisor", "decision": supervisor_response, "usage": usage, "forced": False}
+
+        next_nodes, rejected = split_next_nodes(supervisor_response, allowed)
+        feedback = rejected_feedback(rejected, current_nodes, allowed, starts_workflow(current_nodes, workflow_started)) if rejected and not next_nodes else None
+        if next_nodes or not rejected:
+            workflow_started = supervisor_response.get("workflow_started", True)
+        if rejected:
+            telemetry.increment("illegal_transitions", len(rejected))
+        if not next_nodes and "FINISH" in supervisor_response["next_nodes"]:
+            final = supervisor_response.get("direct_response") or "Workflow complete."
+            checkpoint_event = await checkpoint_hop(supervisor_response, usage, final=final) if WORKFLOW_CHECKPOINTS else None
+            yield {"type": "final", "content": final}
+            if checkpoint_event is not None:
+                yield checkpoint_event
+            break
+        elif next_nodes:
             state.append(AIMessage(content=supervisor_response['instructions'], name="supervisor"))
-            
-            next_agent = next((agent for agent in fetch_agents() if agent["agent_id"] == supervisor_response["next_node"]), None)
-            agent_response = invoke_agent(next_agent, state)
-            agent_response.pretty_print()
-            state.append(agent_response)
+
+            next_agents = await asyncio.to_thread(get_agents, next_nodes)
+            agent_responses = {}
+            with telemetry.span("agents", hop=hop, agents=len(next_agents)):
+                async for event in astream_agents(next_agents, state, state_policy):
+                    yield event
+                    if event["type"] == "agent_message":
+                        agent_responses[event["agent_id"]] = event["message"]
+
+            state.extend(agent_responses[node] for node in next_nodes if agent_responses.get(node) is not None)
+            current_nodes = [agent["agent_id"] for agent in next_agents]
+
+            if WORKFLOW_CHECKPOINTS:
+                yield await checkpoint_hop(supervisor_response, usage, {
+                    agent["agent_id"]: {"agent_name": agent["agent_name"], "content": agent_responses[agent["agent_id"]].content}
+                    for agent in next_agents if agent_responses.get(agent["agent_id"]) is not None
+                })
+
+async def print_workflow_events(events):
+    streaming_agent = None
+    async for event in events:
+        if event["type"] == "supervisor" and event["forced"] and event["decision"]:
+            print(f"\n⏩ Routed to {', '.join(event['decision']['next_nodes'])} without the supervisor")
+        elif event["type"] == "supervisor" and event["usage"]:
+            usage = event["usage"]
+            escalated = f", escalated from {usage['escalated_from']}" if usage.get("escalated_from") else ""
+            print(f"\n🔢 Supervisor tokens ({usage.get('model', 'supervisor')}{escalated}): {usage['prompt_tokens']} prompt ({usage['cached_prompt_tokens']} cached), {usage['completion_tokens']} completion")
+        elif event["type"] == "agent_start":
+            print(f"\n================================== {event['agent_name']} ==================================\n")
+            streaming_agent = event["agent_id"]
+        elif event["type"] == "token":
+            if event["agent_id"] != streaming_agent:
+                print(f"\n[{event['agent_name']}] ", end="")
+                streaming_agent = event["agent_id"]
+            print(event["content"], end="", flush=True)
+        elif event["type"] == "tool_start":
+            print(f"\n🔧 {event['tool']}({json.dumps(event['args'])})")
+        elif event["type"] == "tool_end":
+            print(f"✅ {event['tool']} -> {event['output']}\n")
+        elif event["type"] == "agent_message":
+            print()
+        elif event["type"] == "final":
+            print(f"\n{event['content']}\n")
+        elif event["type"] == "checkpoint":
+            print(f"💾 Saved checkpoint {event['checkpoint_id']} (run {event['run_id']}, hop {event['hop']})")
+        elif event["type"] == "trace" and TRACE_SUMMARY:
+            print(f"\n{telemetry.summary_table(event['summary'])}\n")
+
+def invoke_workflow():
+    selected_workflow = select_workflow()
+    if selected_workflow is None:
+        return
+
+    user_prompt = input("\nYou: ")
+    asyncio.run(print_workflow_events(astream_workflow(selected_workflow, user_prompt)))
     
     return None